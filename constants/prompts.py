@@ -19,6 +19,22 @@ Si algún dato no está presente, deja el campo vacío o como lista vacía.
 Texto del documento:
 """
 
+# Versión reducida: el expediente, el año y las citas ya se extrajeron localmente
+DOCUMENT_JUDGMENT_PROMPT = """
+Eres un analizador de documentos jurídicos. De la sentencia penal extrae solo lo siguiente y responde en formato JSON (las claves deben estar en inglés):
+{
+  "crime": "",
+  "verdict": ""
+}
+- El "crime" debe ser solo el nombre del delito principal por el cual se juzga el caso, de forma breve y específica (por ejemplo: "asesinato", "violencia familiar", "crimen de odio", "conducción en estado de ebriedad", etc.). No incluyas detalles, nombres de personas, hechos, ni el veredicto.
+- "verdict" solo puede ser: "Absuelto", "Culpable", "Sobreseído", "Archivado", "Prescrito", "Desestimado", "Nulidad".
+- Si el texto menciona "Condenado", "Sentencia condenatoria" u otros sinónimos de culpabilidad, usa "Culpable".
+- Si el texto menciona "Sentencia absolutoria" u otros sinónimos de absolución, usa "Absuelto".
+- No inventes ningún dato: solo responde con información que realmente esté presente en el texto recibido.
+Si algún dato no está presente, deja el campo vacío.
+Texto del documento:
+"""
+
 RESUME_TECHNICAL_PROMPT = """
 Rol: Eres un asistente legal experto en Derecho Penal y Procesal Constitucional Peruano.
 
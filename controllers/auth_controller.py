@@ -4,7 +4,7 @@ import jwt
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
-from database.database import SessionLocal
+from database.database import get_db
 from models.user import User
 import uuid
 from datetime import datetime, timedelta, timezone
@@ -14,15 +14,6 @@ bearer_scheme = HTTPBearer()
 
 router = APIRouter()
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "changeme")
 JWT_ALGORITHM = "HS256"
 JWT_EXP_DAYS = 30
@@ -1,153 +1,116 @@
-from fastapi import APIRouter, File, UploadFile
-import json
+from fastapi import APIRouter, File, UploadFile, Query, Response, HTTPException
 from fastapi.responses import JSONResponse, FileResponse
-import time
+from starlette.concurrency import run_in_threadpool
 import os
+import shutil
 from datetime import datetime
 from sqlalchemy.orm import Session
-from database.database import SessionLocal
+from database.database import get_db, session_scope
 from models.document import Document
-from services.file_service import save_uploaded_file
-from services.pdf.pdf_service import extract_text_from_pdf
-from services.document.metadata_service import extract_metadata
-from services.document.document_service import save_document
-from services.document.embedding_service import save_document_embeddings
-from services.pdf.spacy_service import extraer_personas_ambos_casos
-from services.pdf.name_filter_service import (
-    filtrar_nombres,
-    cargar_dataset_nombres,
-    normalizar_nombre,
+from services.file_service import eliminar_archivo, ruta_unica, save_uploaded_file
+from services.document.document_service import save_document, list_pending_page, count_pending
+from services.document.pipeline_service import (
+    PipelineError,
+    analizar_documento_async,
+    aprobar_documento_async,
 )
-from services.pdf.censorship_service import censurar_pdf_con_rectangulos
+from services.jobs.job_service import enqueue_job
 from .auth_controller import get_current_user
 from fastapi import Depends
 import uuid
-from .auth_controller import get_current_user
 
 router = APIRouter()
 
 
-@router.post("/analyze_pdf")
-async def analyze_pdf(
-    file: UploadFile = File(...), current_user=Depends(get_current_user)
-):
-    total_start = time.time()
+# Helpers para el threadpool: abren y cierran su propia sesión
 
-    # Save file to disk
-    file_path = save_uploaded_file(file)
+def _encolar(kind, payload, created_by=None):
+    with session_scope() as db:
+        return enqueue_job(db, kind, payload, created_by=created_by)
 
-    # Extract text from PDF
-    text = extract_text_from_pdf(open(file_path, "rb"))
 
-    # Extract metadata (Gemini)
-    gemini_start = time.time()
-    gemini_success = True
-    try:
-        metadata = extract_metadata(text)
-    except Exception as e:
-        gemini_success = False
-        metadata = {
-            "case_number": "",
-            "case_year": "",
-            "crime": "",
-            "verdict": "",
-            "cited_jurisprudence": "",
-        }
-    gemini_duration = time.time() - gemini_start
-
-    # Extract and filter names
-    names_start = time.time()
-    personas_minusculas, personas_normal = extraer_personas_ambos_casos(file_path)
-    todas_personas = sorted(set(personas_minusculas + personas_normal))
-
-    # Deduplicate by normalization
-    personas_normalizadas = {}
-    for persona in todas_personas:
-        persona_norm = normalizar_nombre(persona)
-        if persona_norm not in personas_normalizadas:
-            personas_normalizadas[persona_norm] = persona
-    todas_personas_unicas = list(personas_normalizadas.values())
-
-    # Filter names
-    dataset_info = cargar_dataset_nombres("data/name_surnames_normalizated.csv")
-    resultado = filtrar_nombres(
-        todas_personas_unicas,
-        dataset_info,
-        personas_minusculas,
-        personas_normal,
-        umbral_minimo=8,
-    )
-    nombres_a_censurar = resultado["nombres_originales_a_censurar"]
-    names_duration = time.time() - names_start
-
-    # Censor PDF and save with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    censored_filename = f"{timestamp}.pdf"
-    censored_path = os.path.join("uploaded_docs", "approved", censored_filename)
+def _buscar_pendiente(document_id):
+    with session_scope() as db:
+        return (
+            db.query(Document.id)
+            .filter(Document.id == document_id, Document.is_approved == False)
+            .first()
+        )
 
-    censurar_pdf_con_rectangulos(file_path, censored_path, nombres_a_censurar)
 
-    # Save document to PostgreSQL with censored PDF path and detected names
-    db: Session = SessionLocal()
-    user_id = current_user["user_id"]
-    if isinstance(user_id, str):
-        user_id = uuid.UUID(user_id)
-    document = save_document(
-        db,
-        metadata,
-        censored_path,
-        detected_names=nombres_a_censurar,
-        uploaded_by=user_id,
-        is_approved=True,
+def _guardar_pendiente(file, user_id):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pending_path = ruta_unica(
+        os.path.join("uploaded_docs", "pending_to_approve"), prefijo=f"{timestamp}_"
     )
-    db.close()
+    with open(pending_path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
 
-    # Save embeddings to Qdrant
-    embedding_start = time.time()
-    num_chunks, embedding_msg = _process_embeddings(document.id, text)
-    embedding_duration = time.time() - embedding_start
+    try:
+        with session_scope() as db:
+            document = save_document(
+                db,
+                metadata={},
+                file_path=pending_path,
+                detected_names=[],
+                is_approved=False,
+                uploaded_by=user_id,
+            )
+            return document.id, pending_path
+    except Exception:
+        eliminar_archivo(pending_path)
+        raise
 
-    total_duration = time.time() - total_start
 
+def _job_response(job):
     return JSONResponse(
+        status_code=202,
         content={
-            "metadata": metadata,
-            "document_id": document.id,
-            "file_url": f"/documents/download/{document.id}",
-            "detected_names": nombres_a_censurar,
-            "total_names_detected": len(todas_personas_unicas),
-            "total_names_censored": len(nombres_a_censurar),
-            "gemini_processing_time_seconds": round(gemini_duration, 3),
-            "name_extraction_time_seconds": round(names_duration, 3),
-            "embedding_processing_time_seconds": round(embedding_duration, 3),
-            "total_processing_time_seconds": round(total_duration, 3),
-            "msg": (
-                f"Document analyzed, censored and saved | {embedding_msg} | "
-                + (
-                    "✅ Metadatos extraídos correctamente"
-                    if gemini_success
-                    else "⚠️ Error extrayendo metadatos, campos vacíos"
-                )
-            ),
-            "gemini_success": gemini_success,
-        }
+            "job_id": str(job.id),
+            "status": job.status,
+            "status_url": f"/jobs/{job.id}",
+        },
     )
 
 
-def _process_embeddings(document_id, text):
+@router.post("/analyze_pdf")
+async def analyze_pdf(
+    file: UploadFile = File(...),
+    background: bool = Query(True, description="Procesar en la cola de jobs"),
+    current_user=Depends(get_current_user),
+):
+    # Save file to disk (escritura bloqueante: en el threadpool)
+    file_path = await run_in_threadpool(save_uploaded_file, file)
+
+    user_id = current_user["user_id"]
+    if isinstance(user_id, str):
+        user_id = uuid.UUID(user_id)
+
+    if background:
+        try:
+            job = await run_in_threadpool(
+                _encolar,
+                "analyze",
+                {"file_path": file_path, "user_id": str(user_id)},
+                created_by=user_id,
+            )
+        except Exception:
+            eliminar_archivo(file_path)
+            raise
+        return _job_response(job)
+
+    # Inline: las etapas CPU corren en los pools de procesos
     try:
-        num_chunks = save_document_embeddings(document_id, text)
-        return num_chunks, f"✅ {num_chunks} chunks saved in Qdrant"
-    except Exception as e:
-        print(f"Error saving embeddings: {str(e)}")
-        return 0, f"⚠️ Error saving embeddings: {str(e)}"
+        return JSONResponse(content=await analizar_documento_async(file_path, user_id))
+    except Exception:
+        # Sin job no hay reintento: el PDF subido ya no sirve
+        eliminar_archivo(file_path)
+        raise
 
 
 @router.get("/documents/download/{document_id}")
-def download_document(document_id: int):
-    db: Session = SessionLocal()
+def download_document(document_id: int, db: Session = Depends(get_db)):
     doc = db.query(Document).filter(Document.id == document_id).first()
-    db.close()
 
     if not doc or not doc.file_path or not os.path.exists(doc.file_path):
         return JSONResponse(status_code=404, content={"msg": "File not found"})
@@ -163,47 +126,40 @@ def download_document(document_id: int):
 async def upload_pending_document(
     file: UploadFile = File(...), current_user=Depends(get_current_user)
 ):
-    os.makedirs("uploaded_docs/pending_to_approve", exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    pending_filename = f"{timestamp}.pdf"
-    pending_path = os.path.join("uploaded_docs", "pending_to_approve", pending_filename)
-
-    with open(pending_path, "wb") as f:
-        f.write(await file.read())
-
-    db: Session = SessionLocal()
-
     # Convierte a UUID si es necesario
     user_id = current_user["user_id"]
     if isinstance(user_id, str):
         user_id = uuid.UUID(user_id)
 
-    document = save_document(
-        db,
-        metadata={},
-        file_path=pending_path,
-        detected_names=[],
-        is_approved=False,
-        uploaded_by=user_id,  # ✅ Ahora es UUID
-    )
-    db.close()
+    # Escritura del PDF y commit bloqueantes: en el threadpool
+    document_id, pending_path = await run_in_threadpool(_guardar_pendiente, file, user_id)
 
     return JSONResponse(
         content={
             "msg": "Documento subido y pendiente de aprobación",
-            "document_id": document.id,
+            "document_id": document_id,
             "file_path": pending_path,
         }
     )
 
 
 @router.get("/documents/pending")
-def get_pending_documents():
-    db: Session = SessionLocal()
-    documents = db.query(Document).filter(Document.is_approved == False).all()
+def get_pending_documents(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500, description="Documentos por página"),
+    cursor: str | None = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    db: Session = Depends(get_db),
+):
+    """Más antiguos primero. Si hay más páginas, el cursor siguiente va en `X-Next-Cursor`."""
+    try:
+        documents, next_cursor = list_pending_page(db, limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     results = []
     for doc in documents:
-        user = doc.uploader  # gracias al relationship en el modelo Document
+        user = doc.uploader  # ya cargado en el mismo query (joinedload)
         results.append(
             {
                 "id": doc.id,
@@ -217,20 +173,22 @@ def get_pending_documents():
                 },
             }
         )
-    db.close()
     return results
 
 
+@router.get("/documents/pending/count")
+def get_pending_count(db: Session = Depends(get_db)):
+    return {"pending": count_pending(db)}
+
+
 @router.delete("/documents/reject/{document_id}")
-def reject_document(document_id: int):
-    db: Session = SessionLocal()
+def reject_document(document_id: int, db: Session = Depends(get_db)):
     document = (
         db.query(Document)
         .filter(Document.id == document_id, Document.is_approved == False)
         .first()
     )
     if not document:
-        db.close()
         return JSONResponse(
             status_code=404, content={"msg": "Documento pendiente no encontrado"}
         )
@@ -241,7 +199,6 @@ def reject_document(document_id: int):
         if file_path and os.path.exists(file_path):
             os.remove(file_path)
     except Exception as e:
-        db.close()
         return JSONResponse(
             status_code=500, content={"msg": f"Error eliminando archivo: {e}"}
         )
@@ -249,149 +206,25 @@ def reject_document(document_id: int):
     # Eliminar el registro de la base de datos
     db.delete(document)
     db.commit()
-    db.close()
     return JSONResponse(
         content={"msg": "Documento rechazado y eliminado correctamente"}
     )
 
 
 @router.post("/documents/approve/{document_id}")
-def approve_document(document_id: int):
-    db: Session = SessionLocal()
-    try:
-        document = (
-            db.query(Document)
-            .filter(Document.id == document_id, Document.is_approved == False)
-            .first()
-        )
-        if not document:
+async def approve_document(
+    document_id: int,
+    background: bool = Query(True, description="Procesar en la cola de jobs"),
+):
+    if background:
+        if not await run_in_threadpool(_buscar_pendiente, document_id):
             return JSONResponse(
                 status_code=404, content={"msg": "Documento pendiente no encontrado"}
             )
+        job = await run_in_threadpool(_encolar, "approve", {"document_id": document_id})
+        return _job_response(job)
 
-        file_path = document.file_path
-        if not os.path.exists(file_path):
-            return JSONResponse(
-                status_code=404, content={"msg": "Archivo PDF no encontrado"}
-            )
-
-        # Procesar PDF y extraer info
-        try:
-            with open(file_path, "rb") as f:
-                text = extract_text_from_pdf(f)
-        except Exception as e:
-            return JSONResponse(
-                status_code=500, content={"msg": f"Error extrayendo texto del PDF: {e}"}
-            )
-
-        try:
-            metadata = extract_metadata(text)
-            gemini_success = True
-        except Exception as e:
-            gemini_success = False
-            metadata = {
-                "case_number": "",
-                "case_year": "",
-                "crime": "",
-                "verdict": "",
-                "cited_jurisprudence": [],
-            }
-
-        # Extraer y filtrar nombres
-        try:
-            personas_minusculas, personas_normal = extraer_personas_ambos_casos(
-                file_path
-            )
-            todas_personas = sorted(set(personas_minusculas + personas_normal))
-            personas_normalizadas = {}
-            for persona in todas_personas:
-                persona_norm = normalizar_nombre(persona)
-                if persona_norm not in personas_normalizadas:
-                    personas_normalizadas[persona_norm] = persona
-            todas_personas_unicas = list(personas_normalizadas.values())
-            dataset_info = cargar_dataset_nombres("data/name_surnames_normalizated.csv")
-            resultado = filtrar_nombres(
-                todas_personas_unicas,
-                dataset_info,
-                personas_minusculas,
-                personas_normal,
-                umbral_minimo=8,
-            )
-            nombres_a_censurar = resultado["nombres_originales_a_censurar"]
-        except Exception as e:
-            return JSONResponse(
-                status_code=500,
-                content={"msg": f"Error extrayendo o filtrando nombres: {e}"},
-            )
-
-        # Censurar PDF y mover a carpeta de aprobados
-        try:
-            os.makedirs("uploaded_docs/approved", exist_ok=True)
-            approved_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            approved_path = os.path.join("uploaded_docs", "approved", approved_filename)
-            censurar_pdf_con_rectangulos(file_path, approved_path, nombres_a_censurar)
-        except Exception as e:
-            return JSONResponse(
-                status_code=500, content={"msg": f"Error censurando PDF: {e}"}
-            )
-
-        # Eliminar el archivo pendiente
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            # No es crítico, solo advertencia
-            print(f"Advertencia: No se pudo eliminar el archivo pendiente: {e}")
-
-        # Actualizar documento en la base de datos
-        try:
-            document.file_path = approved_path
-            document.is_approved = True
-            document.detected_names = json.dumps(nombres_a_censurar, ensure_ascii=False)
-            document.case_number = metadata.get("case_number")
-            document.case_year = metadata.get("case_year") or metadata.get("year") or ""
-            document.crime = metadata.get("crime")
-            document.verdict = metadata.get("verdict")
-            cited_jurisprudence = metadata.get("cited_jurisprudence", [])
-            if not cited_jurisprudence:
-                cited_jurisprudence = []
-            document.cited_jurisprudence = json.dumps(
-                cited_jurisprudence, ensure_ascii=False
-            )
-            db.commit()
-        except Exception as e:
-            db.rollback()
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "msg": f"Error actualizando documento en la base de datos: {e}"
-                },
-            )
-
-        # Guardar embeddings
-        try:
-            num_chunks = save_document_embeddings(document.id, text)
-            embedding_msg = f"✅ {num_chunks} chunks saved in Qdrant"
-        except Exception as e:
-            embedding_msg = f"⚠️ Error saving embeddings: {str(e)}"
-
-        return JSONResponse(
-            content={
-                "metadata": metadata,
-                "document_id": document.id,
-                "file_url": f"/documents/download/{document.id}",
-                "detected_names": nombres_a_censurar,
-                "total_names_detected": len(todas_personas_unicas),
-                "total_names_censored": len(nombres_a_censurar),
-                "msg": (
-                    f"Documento aprobado, censurado y guardado | {embedding_msg} | "
-                    + (
-                        "✅ Metadatos extraídos correctamente"
-                        if gemini_success
-                        else "⚠️ Error extrayendo metadatos, campos vacíos"
-                    )
-                ),
-                "gemini_success": gemini_success,
-            }
-        )
-    finally:
-        db.close()
+    try:
+        return JSONResponse(content=await aprobar_documento_async(document_id))
+    except PipelineError as e:
+        return JSONResponse(status_code=e.status_code, content={"msg": e.msg})
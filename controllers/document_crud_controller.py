@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from database.database import SessionLocal
+from database.database import fetch_all, get_db, session_scope
 from models.document import Document
+from models.user import User
 from pydantic import BaseModel
 import json
 import os
+from services.document.document_cache import invalidar_documento
+from services.document.document_service import list_documents_page, iter_documents, contains_element
+from services.qdrant.qdrant_service import update_document_payload
+from .auth_controller import get_current_user
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 class DocumentBase(BaseModel):
@@ -19,47 +26,148 @@ class DocumentBase(BaseModel):
 class DocumentUpdate(DocumentBase):
     pass
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def _cited_jurisprudence(doc):
+    cited_juris = doc.cited_jurisprudence
+    return cited_juris if isinstance(cited_juris, list) else []
+
+def _list_item(doc):
+    return {
+        "id": doc.id,
+        "case_number": doc.case_number or "",
+        "case_year": doc.case_year or "",
+        "crime": doc.crime or "",
+        "verdict": doc.verdict or "",
+        "cited_jurisprudence": _cited_jurisprudence(doc),
+        "file_path": doc.file_path or ""
+    }
+
+def _list_filters(
+    crime: str | None = Query(None, description="Filtra por delito"),
+    case_year: str | None = Query(None, description="Filtra por año del expediente"),
+    verdict: str | None = Query(None, description="Filtra por veredicto"),
+    is_approved: bool | None = Query(None, description="Filtra por estado de aprobación"),
+):
+    return {
+        "crime": crime,
+        "case_year": case_year,
+        "verdict": verdict,
+        "is_approved": is_approved,
+    }
 
 @router.get("/", response_model=list[DocumentBase])
-def list_documents(db: Session = Depends(get_db)):
-    docs = db.query(Document).all()
-    result = []
-    for doc in docs:
-        try:
-            cited_juris = json.loads(doc.cited_jurisprudence or "[]")
-            if not isinstance(cited_juris, list):
-                cited_juris = []
-        except Exception:
-            cited_juris = []
-        result.append({
-            "id": doc.id,
-            "case_number": doc.case_number or "",
-            "case_year": doc.case_year or "",
-            "crime": doc.crime or "",
-            "verdict": doc.verdict or "",
-            "cited_jurisprudence": cited_juris,
-            "file_path": doc.file_path or ""
-        })
-    return result
+def list_documents(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500, description="Documentos por página"),
+    cursor: str | None = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    filters: dict = Depends(_list_filters),
+    db: Session = Depends(get_db),
+):
+    """Más recientes primero. Si hay más páginas, el cursor siguiente va en `X-Next-Cursor`."""
+    try:
+        docs, next_cursor = list_documents_page(db, limit, cursor=cursor, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_list_item(doc) for doc in docs]
+
+@router.get("/export")
+def export_documents(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$", description="ndjson | json"),
+    filters: dict = Depends(_list_filters),
+):
+    """Exporta todos los documentos del filtro en streaming, sin cargarlos en memoria."""
+    def generar():
+        # Sesión propia: la de Depends se cierra antes de terminar el streaming
+        with session_scope() as db:
+            if fmt == "json":
+                yield "["
+            for i, doc in enumerate(iter_documents(db, filters)):
+                item = {**_list_item(doc), "created_at": doc.created_at.isoformat() if doc.created_at else None}
+                linea = json.dumps(item, ensure_ascii=False)
+                if fmt == "json":
+                    yield ("," if i else "") + linea
+                else:
+                    yield linea + "\n"
+            if fmt == "json":
+                yield "]"
+
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return StreamingResponse(generar(), media_type=media_type)
+
+def _documents_containing(response, db, column, value, partial, limit, cursor, filters):
+    try:
+        docs, next_cursor = list_documents_page(
+            db,
+            limit,
+            cursor=cursor,
+            filters=filters,
+            where=(contains_element(column, value, partial=partial),),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_list_item(doc) for doc in docs]
+
+# Declaradas antes de /{document_id} para que no se interpreten como un id
+@router.get("/by-citation", response_model=list[DocumentBase])
+def find_documents_by_citation(
+    response: Response,
+    citation: str = Query(..., min_length=3, description="Cita tal como se guardó, p. ej. 'Casación N.° 123-2019/Lima'"),
+    partial: bool = Query(False, description="Buscar el texto dentro de las citas (sin índice)"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    filters: dict = Depends(_list_filters),
+    db: Session = Depends(get_db),
+):
+    """Documentos que citan la jurisprudencia dada (búsqueda exacta con índice GIN)."""
+    return _documents_containing(
+        response, db, Document.cited_jurisprudence, citation, partial, limit, cursor, filters
+    )
+
+@router.get("/by-name", response_model=list[DocumentBase])
+def find_documents_by_name(
+    response: Response,
+    name: str = Query(..., min_length=3, description="Nombre censurado, tal como se detectó"),
+    partial: bool = Query(False, description="Buscar el texto dentro de los nombres (sin índice)"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    filters: dict = Depends(_list_filters),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Documentos en los que se censuró el nombre dado. Requiere autenticación."""
+    return _documents_containing(
+        response, db, Document.detected_names, name, partial, limit, cursor, filters
+    )
 
 @router.get("/{document_id}")
-def get_document(document_id: int, db: Session = Depends(get_db)):
-    doc = db.query(Document).filter(Document.id == document_id).first()
-    if not doc:
+async def get_document(document_id: int):
+    # Documento y usuario en una sola consulta, async (asyncpg si ASYNC_DB_ENABLED)
+    rows = await fetch_all(
+        select(
+            Document.id,
+            Document.uploaded_by,
+            Document.file_path,
+            Document.created_at,
+            Document.case_number,
+            Document.case_year,
+            Document.crime,
+            Document.verdict,
+            Document.cited_jurisprudence,
+            Document.resume,
+            User.first_name,
+            User.last_name,
+            User.email,
+        )
+        .outerjoin(User, User.id == Document.uploaded_by)
+        .where(Document.id == document_id)
+    )
+    if not rows:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
-    try:
-        cited_juris = json.loads(doc.cited_jurisprudence or "[]")
-        if not isinstance(cited_juris, list):
-            cited_juris = []
-    except Exception:
-        cited_juris = []
-    user = doc.uploader  # gracias al relationship en el modelo Document
+    doc = rows[0]
+    cited_juris = _cited_jurisprudence(doc)
     return {
         "id": doc.id,
         "uploaded_by": str(doc.uploaded_by) if doc.uploaded_by else None,
@@ -72,9 +180,9 @@ def get_document(document_id: int, db: Session = Depends(get_db)):
         "cited_jurisprudence": cited_juris,
         "resume": doc.resume or "",
         "user": {
-            "first_name": user.first_name if user else None,
-            "last_name": user.last_name if user else None,
-            "email": user.email if user else None
+            "first_name": doc.first_name,
+            "last_name": doc.last_name,
+            "email": doc.email
         }
     }
 
@@ -87,17 +195,23 @@ def update_document(document_id: int, document: DocumentUpdate, db: Session = De
     doc.case_year = document.case_year
     doc.crime = document.crime
     doc.verdict = document.verdict
-    doc.cited_jurisprudence = json.dumps(document.cited_jurisprudence, ensure_ascii=False)
+    doc.cited_jurisprudence = document.cited_jurisprudence
     doc.file_path = document.file_path
     db.commit()
     db.refresh(doc)
+    invalidar_documento(doc.id)
+    try:
+        # Mantiene los filtros de /search sincronizados con la metadata editada
+        update_document_payload(doc.id, document.model_dump(), is_approved=doc.is_approved)
+    except Exception as e:
+        print(f"Advertencia: no se pudo actualizar el payload en Qdrant: {e}")
     return {
         "id": doc.id,
         "case_number": doc.case_number,
         "case_year": doc.case_year,
         "crime": doc.crime,
         "verdict": doc.verdict,
-        "cited_jurisprudence": json.loads(doc.cited_jurisprudence or "[]"),
+        "cited_jurisprudence": _cited_jurisprudence(doc),
         "file_path": doc.file_path
     }
 
@@ -115,4 +229,5 @@ def delete_document(document_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error eliminando archivo: {e}")
     db.delete(doc)
     db.commit()
+    invalidar_documento(document_id)
     return {"msg": "Documento y archivo eliminados correctamente"}
\ No newline at end of file
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from database.database import get_db
+from models.job import Job
+from services.jobs.job_service import job_to_dict
+from .auth_controller import get_current_user
+import uuid
+
+router = APIRouter()
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: uuid.UUID, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job_to_dict(job)
@@ -1,77 +1,140 @@
-from fastapi import APIRouter, Query, Depends
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Query
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from database.database import SessionLocal
-from models.document import Document
+from starlette.concurrency import run_in_threadpool
+from database.database import session_scope
 from services.qdrant.embeddings_service import get_embedding
-from services.qdrant.qdrant_service import search_embeddings
-import json
+from services.qdrant.qdrant_service import search_embeddings, search_embedding_groups
+from services.executor_service import run_in_pool_sync
+from services.qdrant.query_cache import get_query_embedding, cache_stats
+from services.document.document_cache import obtener_metadata_documentos_async
+from services.document.chunk_service import search_chunks_lexical
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Constante estándar de Reciprocal Rank Fusion
+RRF_K = 60
+
+# Hilos para lanzar la búsqueda léxica y la vectorial a la vez
+_search_executor = ThreadPoolExecutor(max_workers=8)
+
+def _hit_from_point(item):
+    item = item.model_dump() if hasattr(item, "model_dump") else dict(item)
+    payload = item.get("payload") if isinstance(item.get("payload"), dict) else {}
+    if not payload.get("document_id"):
+        return None
+    return {
+        "document_id": payload.get("document_id"),
+        "chunk_index": payload.get("chunk_index"),
+        "text": payload.get("text"),
+        "score": item.get("score"),
+    }
+
+def _vector_hits(query, limit, filters, offset, per_document=False):
+    # Consultas repetidas salen de la caché; en un miss el forward de MiniLM
+    # corre en el pool de embeddings, no en este proceso
+    embedding = get_query_embedding(
+        query, lambda texto: run_in_pool_sync("embedding", get_embedding, texto)
+    )
+    # Los filtros se aplican dentro de Qdrant (payload indexado), no en Python
+    if per_document:
+        # Un grupo por documento con su mejor chunk: `limit` documentos distintos
+        groups = search_embedding_groups(embedding, top_k=limit, filters=filters, offset=offset)
+        points = [group.hits[0] for group in groups if group.hits]
+    else:
+        points = search_embeddings(embedding, top_k=limit, filters=filters, offset=offset)
+    return [hit for hit in map(_hit_from_point, points) if hit]
+
+def _lexical_hits(query, limit, filters, offset, per_document=False):
+    # Sesión propia: corre en otro hilo que la búsqueda vectorial
+    with session_scope() as db:
+        return search_chunks_lexical(
+            db, query, limit, offset=offset, filters=filters, per_document=per_document
+        )
+
+def _rrf(rankings, per_document=False):
+    """Fusiona rankings (de chunks o de documentos) con Reciprocal Rank Fusion."""
+    fused = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            key = hit["document_id"] if per_document else (hit["document_id"], hit["chunk_index"])
+            entry = fused.setdefault(key, dict(hit, score=0.0))
+            entry["score"] += 1.0 / (RRF_K + rank)
+    return sorted(fused.values(), key=lambda h: h["score"], reverse=True)
+
+def _buscar_hits(query, top_k, offset, mode, group_by_document, filters):
+    if mode == "hybrid":
+        # Cada ranking trae hasta offset + 2*top_k candidatos; la página se corta tras fusionar
+        fetch = offset + 2 * top_k
+        vector_future = _search_executor.submit(
+            _vector_hits, query, fetch, filters, 0, group_by_document
+        )
+        lexical_future = _search_executor.submit(
+            _lexical_hits, query, fetch, filters, 0, group_by_document
+        )
+        vector, lexical = vector_future.result(), lexical_future.result()
+        fused = _rrf([vector, lexical], per_document=group_by_document)
+        hits = fused[offset:offset + top_k]
+        has_more = len(fused) > offset + top_k or max(len(vector), len(lexical)) == fetch
+    elif mode == "lexical":
+        hits = _lexical_hits(query, top_k, filters, offset, group_by_document)
+        has_more = len(hits) == top_k
+    else:
+        hits = _vector_hits(query, top_k, filters, offset, group_by_document)
+        has_more = len(hits) == top_k
+    return hits, has_more
 
 @router.get("/search")
-def search_documents(
+async def search_documents(
     query: str = Query(..., description="Palabra o frase a buscar"),
     top_k: int = 5,
-    db: Session = Depends(get_db)
+    offset: int = Query(0, ge=0, description="Resultados a saltar (paginación)"),
+    mode: str = Query("vector", pattern="^(vector|lexical|hybrid)$", description="vector | lexical | hybrid (RRF)"),
+    group_by_document: bool = Query(True, description="top_k documentos distintos en vez de top_k chunks"),
+    crime: str | None = Query(None, description="Filtra por delito (coincidencia exacta)"),
+    case_year: str | None = Query(None, description="Filtra por año del expediente"),
+    verdict: str | None = Query(None, description="Filtra por veredicto"),
+    is_approved: bool | None = Query(None, description="Filtra por estado de aprobación"),
 ):
-    embedding = get_embedding(query)
-    results = search_embeddings(embedding, top_k=top_k)
-    grouped = {}
+    filters = {
+        "crime": crime,
+        "case_year": case_year,
+        "verdict": verdict,
+        "is_approved": is_approved,
+    }
 
-    for r in results:
-        item = r.model_dump() if hasattr(r, "model_dump") else dict(r)
-        doc_id = None
-        if "payload" in item and isinstance(item["payload"], dict):
-            doc_id = item["payload"].get("document_id")
-        if not doc_id:
-            continue
+    # Qdrant y el encoder son bloqueantes: van al threadpool
+    hits, has_more = await run_in_threadpool(
+        _buscar_hits, query, top_k, offset, mode, group_by_document, filters
+    )
 
-        score = item.get("score")
+    grouped = {}
+    for hit in hits:
+        doc_id = hit["document_id"]
         chunk = {
-            "score": score,
-            "chunk_index": item.get("payload", {}).get("chunk_index"),
-            "text": item.get("payload", {}).get("text"),
+            "score": hit["score"],
+            "chunk_index": hit["chunk_index"],
+            "text": hit["text"],
         }
 
         # Solo guardar el chunk con mayor score por documento
-        if doc_id not in grouped or score > grouped[doc_id]["chunk"]["score"]:
-            doc = db.query(Document).filter(Document.id == doc_id).first()
-            if doc:
-                try:
-                    cited_juris = json.loads(doc.cited_jurisprudence or "[]")
-                    if not isinstance(cited_juris, list):
-                        cited_juris = []
-                except Exception:
-                    cited_juris = []
-                try:
-                    detected_names = json.loads(doc.detected_names or "[]")
-                    if not isinstance(detected_names, list):
-                        detected_names = []
-                except Exception:
-                    detected_names = []
-                metadata = {
-                    "id": doc.id,
-                    "case_number": doc.case_number or "",
-                    "case_year": doc.case_year or "",
-                    "crime": doc.crime or "",
-                    "verdict": doc.verdict or "",
-                    "cited_jurisprudence": cited_juris,
-                }
-            else:
-                metadata = None
+        if doc_id not in grouped or chunk["score"] > grouped[doc_id]["chunk"]["score"]:
             grouped[doc_id] = {
                 "document_id": doc_id,
-                "metadata": metadata,
+                "metadata": None,
                 "chunk": chunk
             }
 
+    # Metadata de todos los documentos en una sola consulta (con caché LRU)
+    metadata_por_id = await obtener_metadata_documentos_async(grouped.keys())
+    for doc_id, resultado in grouped.items():
+        resultado["metadata"] = metadata_por_id.get(doc_id)
+
     response = list(grouped.values())
-    return JSONResponse(content={"results": response}) 
\ No newline at end of file
+    next_offset = offset + top_k if has_more else None
+    return JSONResponse(content={"results": response, "next_offset": next_offset})
+
+
+@router.get("/search/cache_stats")
+def search_cache_stats():
+    return cache_stats()
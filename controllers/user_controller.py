@@ -1,23 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database.database import SessionLocal
+from sqlalchemy import select
+from database.database import fetch_all
 from models.user import User
 from .auth_controller import get_current_user
+import uuid
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/me")
-def get_my_user_info(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == current_user["user_id"]).first()
-    if not user:
+async def get_my_user_info(current_user=Depends(get_current_user)):
+    # Lectura async (asyncpg si ASYNC_DB_ENABLED): no ocupa un hilo esperando a Postgres
+    rows = await fetch_all(
+        select(
+            User.id, User.email, User.first_name, User.last_name, User.role, User.created_at
+        ).where(User.id == uuid.UUID(str(current_user["user_id"])))
+    )
+    if not rows:
         raise HTTPException(status_code=404, detail="User not found")
+    user = rows[0]
     return {
         "id": str(user.id),
         "email": user.email,
@@ -25,4 +25,4 @@ def get_my_user_info(current_user=Depends(get_current_user), db: Session = Depen
         "last_name": user.last_name,
         "role": user.role,
         "created_at": user.created_at.isoformat() if user.created_at else None
-    }
\ No newline at end of file
+    }
@@ -1,7 +1,9 @@
 import os
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
 
 dotenv_file = os.getenv("DOTENV_FILE", ".env")
 load_dotenv(dotenv_file)
@@ -10,6 +12,83 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL no está configurado en el entorno.")
 
-engine = create_engine(DATABASE_URL)
+# Pool de conexiones (por proceso: API, cada worker de jobs, ...)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+# Recicla conexiones antes de que Postgres o un proxy las corten por inactividad
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Engine async (asyncpg) para los endpoints de lectura más usados
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB_ENABLED", "false").lower() == "true"
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL.replace(
+    "postgresql+psycopg2://", "postgresql+asyncpg://"
+).replace("postgresql://", "postgresql+asyncpg://")
+# Pool propio del engine async: se suma al sync en los procesos que lo usan (la API)
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 5))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 10))
+
+_POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+    "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+engine = create_engine(DATABASE_URL, **_POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+_async_sessionmaker = None
+
+
+@contextmanager
+def session_scope():
+    """Sesión que siempre se cierra, para código que corre en el threadpool o fuera de una petición."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_db():
+    """Dependencia de FastAPI: una sesión por petición."""
+    with session_scope() as db:
+        yield db
+
+
+def get_async_sessionmaker():
+    """Sessionmaker async, creado en el primer uso (requiere el extra `async`)."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            **{
+                **_POOL_OPTIONS,
+                "pool_size": ASYNC_DB_POOL_SIZE,
+                "max_overflow": ASYNC_DB_MAX_OVERFLOW,
+            },
+        )
+        _async_sessionmaker = async_sessionmaker(async_engine, expire_on_commit=False)
+    return _async_sessionmaker
+
+
+def _fetch_all_sync(stmt):
+    with session_scope() as db:
+        return db.execute(stmt).all()
+
+
+async def fetch_all(stmt):
+    """
+    Filas de una consulta de solo lectura (`select(...)` de columnas).
+    Con ASYNC_DB_ENABLED usa asyncpg y no ocupa hilos; si no, corre en el threadpool.
+    """
+    if ASYNC_DB_ENABLED:
+        async with get_async_sessionmaker()() as session:
+            return (await session.execute(stmt)).all()
+    return await run_in_threadpool(_fetch_all_sync, stmt)
@@ -0,0 +1,28 @@
+from collections import defaultdict
+from services.qdrant.qdrant_service import qdrant, collection_name
+from services.document.chunk_service import save_document_chunks
+
+# Llena el índice léxico (document_chunks) con los chunks ya guardados en Qdrant
+chunks_por_documento = defaultdict(dict)
+offset = None
+while True:
+    points, offset = qdrant.scroll(
+        collection_name=collection_name,
+        limit=256,
+        offset=offset,
+        with_payload=["document_id", "chunk_index", "full_text"],
+        with_vectors=False,
+    )
+    for point in points:
+        payload = point.payload or {}
+        if payload.get("document_id") is None:
+            continue
+        chunks_por_documento[payload["document_id"]][payload.get("chunk_index", 0)] = (
+            payload.get("full_text") or ""
+        )
+    if offset is None:
+        break
+
+for document_id, chunks in chunks_por_documento.items():
+    save_document_chunks(document_id, [chunks[i] for i in sorted(chunks)])
+print(f"Chunks léxicos guardados para {len(chunks_por_documento)} documentos")
@@ -0,0 +1,19 @@
+from database.database import SessionLocal
+from models.document import Document
+from services.qdrant.qdrant_service import ensure_collection, update_document_payload
+
+# Copia la metadata de Postgres al payload de los chunks ya indexados en Qdrant
+ensure_collection()
+db = SessionLocal()
+try:
+    documentos = db.query(Document).filter(Document.is_approved == True).all()
+    for doc in documentos:
+        metadata = {
+            "case_year": doc.case_year,
+            "crime": doc.crime,
+            "verdict": doc.verdict,
+        }
+        update_document_payload(doc.id, metadata, is_approved=True)
+    print(f"Payload actualizado para {len(documentos)} documentos")
+finally:
+    db.close()
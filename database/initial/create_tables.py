@@ -1,11 +1,29 @@
+from sqlalchemy import text
 from database.database import Base, engine
 from models.user import User
 from models.document import Document
+from models.job import Job
+from models.document_chunk import DocumentChunk
+from models.gemini_cache import GeminiCacheEntry
 
 print("FKs registradas:", Base.metadata.tables["documents"].foreign_keys)
 
 # Crear primero users, luego documents
 User.__table__.create(bind=engine, checkfirst=True)
 Document.__table__.create(bind=engine, checkfirst=True)
+# Índices agregados después de crear la tabla (bases ya existentes)
+for index in Document.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+Job.__table__.create(bind=engine, checkfirst=True)
+# Columna agregada después de crear la tabla (bases ya existentes)
+with engine.begin() as conn:
+    conn.execute(
+        text(
+            "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS document_id INTEGER "
+            "REFERENCES documents(id) ON DELETE SET NULL"
+        )
+    )
+DocumentChunk.__table__.create(bind=engine, checkfirst=True)
+GeminiCacheEntry.__table__.create(bind=engine, checkfirst=True)
 
 print("Tablas creadas con foreign keys")
\ No newline at end of file
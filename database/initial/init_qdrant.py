@@ -1,5 +1,6 @@
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import Distance, VectorParams
+from services.qdrant.qdrant_service import ensure_payload_indexes
 
 client = QdrantClient(host="localhost", port=6333)
 
@@ -15,4 +16,8 @@ if collection_name not in [c.name for c in client.get_collections().collections]
     )
     print(f"Collection '{collection_name}' created.")
 else:
-    print(f"Collection '{collection_name}' already exists.")
\ No newline at end of file
+    print(f"Collection '{collection_name}' already exists.")
+
+# Índices de payload para los filtros de /search
+ensure_payload_indexes(client)
+print("Payload indexes listos.")
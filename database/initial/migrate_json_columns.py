@@ -0,0 +1,57 @@
+import json
+from sqlalchemy import text
+from database.database import engine
+from models.document import Document
+
+# Pasa documents.cited_jurisprudence y documents.detected_names de Text (JSON
+# serializado) a JSONB y crea sus índices GIN. Se puede correr más de una vez.
+COLUMNAS = ("cited_jurisprudence", "detected_names")
+
+
+def _tipo_columna(conn, columna):
+    return conn.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'documents' AND column_name = :columna"
+        ),
+        {"columna": columna},
+    ).scalar()
+
+
+def _lista_valida(valor):
+    try:
+        lista = json.loads(valor or "[]")
+    except Exception:
+        return None
+    return lista if isinstance(lista, list) else None
+
+
+with engine.begin() as conn:
+    for columna in COLUMNAS:
+        if _tipo_columna(conn, columna) == "jsonb":
+            print(f"{columna}: ya es JSONB")
+            continue
+
+        # Las filas con JSON inválido o que no sea una lista quedan como []
+        filas = conn.execute(text(f"SELECT id, {columna} FROM documents")).all()
+        invalidas = [{"id": fila.id} for fila in filas if _lista_valida(fila[1]) is None]
+        if invalidas:
+            conn.execute(
+                text(f"UPDATE documents SET {columna} = '[]' WHERE id = :id"), invalidas
+            )
+
+        conn.execute(
+            text(
+                f"ALTER TABLE documents ALTER COLUMN {columna} TYPE JSONB "
+                f"USING COALESCE(NULLIF(btrim({columna}), ''), '[]')::jsonb"
+            )
+        )
+        conn.execute(text(f"ALTER TABLE documents ALTER COLUMN {columna} SET DEFAULT '[]'::jsonb"))
+        conn.execute(text(f"ALTER TABLE documents ALTER COLUMN {columna} SET NOT NULL"))
+        print(f"{columna}: migrada a JSONB ({len(filas)} filas, {len(invalidas)} corregidas)")
+
+    # Índices GIN (y los demás índices del modelo que falten)
+    for index in Document.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+print("Migración a JSONB completada")
@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from controllers.document_controller import router as documento_router
 from controllers.document_crud_controller import router as crud_router
@@ -8,6 +9,10 @@ from controllers.test_controller import router as test_router
 from controllers.user_controller import router as user_router
 from controllers.pdf_controller import include_static
 from controllers.resume_ia_controller import router as resume_ia_router
+from controllers.job_controller import router as job_router
+from services.executor_service import shutdown_pools
+from services.warmup_service import start_warm_up, readiness
+from services.document.gemini_client import gemini_status
 
 app = FastAPI()
 
@@ -20,14 +25,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
+@app.on_event("startup")
+def iniciar_servicios():
+    # Carga modelos y pools en paralelo, en segundo plano; /ready indica cuándo terminó
+    start_warm_up()
+
+
+@app.on_event("shutdown")
+def cerrar_pools():
+    shutdown_pools()
+
+
 @app.get("/")
 def ping():
     return {"message": "pong"}
 
 
+@app.get("/ready")
+def ready():
+    estado = readiness()
+    # Estado del circuit breaker de Gemini: informativo, no afecta al readiness
+    content = {**estado, "gemini": gemini_status()}
+    return JSONResponse(status_code=200 if estado["ready"] else 503, content=content)
+
+
 app.include_router(documento_router)
 app.include_router(crud_router)
 app.include_router(search_router)
@@ -35,4 +60,5 @@ app.include_router(auth_router, prefix="/auth")
 app.include_router(test_router)
 app.include_router(user_router)
 app.include_router(resume_ia_router)
+app.include_router(job_router)
 include_static(app)
@@ -1,4 +1,7 @@
 from .user import User
 from .document import Document
+from .job import Job
+from .document_chunk import DocumentChunk
+from .gemini_cache import GeminiCacheEntry
 
-__all__ = ["User", "Document"]
\ No newline at end of file
+__all__ = ["User", "Document", "Job", "DocumentChunk", "GeminiCacheEntry"]
\ No newline at end of file
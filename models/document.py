@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, TIMESTAMP, text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, TIMESTAMP, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 from database.database import Base
 
@@ -11,9 +11,9 @@ class Document(Base):
     case_year = Column(String(10))
     crime = Column(Text)
     verdict = Column(Text)
-    cited_jurisprudence = Column(Text)
+    cited_jurisprudence = Column(JSONB, nullable=False, server_default=text("'[]'::jsonb"), default=list)
     file_path = Column(String(255))
-    detected_names = Column(Text)
+    detected_names = Column(JSONB, nullable=False, server_default=text("'[]'::jsonb"), default=list)
     resume = Column(Text)
 
     uploaded_by = Column(
@@ -27,3 +27,28 @@ class Document(Base):
     created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
 
     uploader = relationship("User", backref="documents")
+
+    __table_args__ = (
+        # Paginación keyset de GET /documents (ORDER BY created_at DESC, id DESC)
+        Index("ix_documents_created_at_id", "created_at", "id"),
+        # Cola de pendientes: solo indexa los documentos sin aprobar
+        Index(
+            "ix_documents_pending_created_at",
+            "created_at",
+            "id",
+            postgresql_where=text("is_approved = false"),
+        ),
+        # Búsqueda por cita o por nombre censurado (operador @>)
+        Index(
+            "ix_documents_cited_jurisprudence",
+            "cited_jurisprudence",
+            postgresql_using="gin",
+            postgresql_ops={"cited_jurisprudence": "jsonb_path_ops"},
+        ),
+        Index(
+            "ix_documents_detected_names",
+            "detected_names",
+            postgresql_using="gin",
+            postgresql_ops={"detected_names": "jsonb_path_ops"},
+        ),
+    )
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from database.database import Base
+
+class DocumentChunk(Base):
+    __tablename__ = "document_chunks"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(
+        Integer,
+        ForeignKey("documents.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    chunk_index = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+
+    # Índice léxico (búsqueda híbrida): lo mantiene Postgres al insertar
+    tsv = Column(TSVECTOR, Computed("to_tsvector('spanish', text)", persisted=True))
+
+    __table_args__ = (
+        Index("ix_document_chunks_tsv", "tsv", postgresql_using="gin"),
+    )
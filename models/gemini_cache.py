@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, text
+from database.database import Base
+
+class GeminiCacheEntry(Base):
+    __tablename__ = "gemini_cache"
+
+    # SHA-256 de (modelo, prompt, texto)
+    key = Column(String(64), primary_key=True)
+    model = Column(String(100), nullable=False)
+    response = Column(Text, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"), index=True)
+    last_used_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"), index=True)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, TIMESTAMP, text
+from sqlalchemy.dialects.postgresql import UUID
+from database.database import Base
+import uuid
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String(30), nullable=False)  # analyze | approve
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued | running | done | failed
+    payload = Column(Text)  # JSON con los argumentos del pipeline
+    result = Column(Text)  # JSON con la respuesta del pipeline
+    error = Column(Text)
+    current_stage = Column(String(50))
+    timings = Column(Text)  # JSON {etapa: segundos}
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    # Documento ya guardado por este job: un reintento lo retoma en lugar de insertar otro
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"))
+
+    run_after = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    locked_at = Column(TIMESTAMP)
+    created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    updated_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
@@ -0,0 +1,65 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database.database import SessionLocal
+from models.document import Document
+from models.document_chunk import DocumentChunk
+from services.document.document_service import apply_document_filters
+
+TS_CONFIG = "spanish"
+
+
+def save_document_chunks(document_id, chunks):
+    """Reemplaza los chunks léxicos del documento (mismo chunking que Qdrant)."""
+    db: Session = SessionLocal()
+    try:
+        db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete(
+            synchronize_session=False
+        )
+        db.bulk_insert_mappings(
+            DocumentChunk,
+            [
+                {"document_id": int(document_id), "chunk_index": idx, "text": chunk}
+                for idx, chunk in enumerate(chunks)
+            ],
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def search_chunks_lexical(db: Session, query, limit, offset=0, filters=None, per_document=False):
+    """
+    Búsqueda full-text (tsvector + GIN) ordenada por ts_rank_cd.
+    Con `per_document=True` devuelve solo el mejor chunk de cada documento,
+    así `limit` equivale a documentos distintos.
+    """
+    tsquery = func.websearch_to_tsquery(TS_CONFIG, query)
+    rank = func.ts_rank_cd(DocumentChunk.tsv, tsquery).label("rank")
+    columns = [DocumentChunk.document_id, DocumentChunk.chunk_index, DocumentChunk.text, rank]
+    if per_document:
+        columns.append(
+            func.row_number()
+            .over(partition_by=DocumentChunk.document_id, order_by=rank.desc())
+            .label("position")
+        )
+    q = (
+        db.query(*columns)
+        .join(Document, Document.id == DocumentChunk.document_id)
+        .filter(DocumentChunk.tsv.op("@@")(tsquery))
+    )
+    q = apply_document_filters(q, filters)
+    if per_document:
+        ranked = q.subquery()
+        q = db.query(ranked).filter(ranked.c.position == 1)
+        rows = q.order_by(ranked.c.rank.desc()).offset(offset).limit(limit).all()
+    else:
+        rows = q.order_by(rank.desc()).offset(offset).limit(limit).all()
+    return [
+        {
+            "document_id": row.document_id,
+            "chunk_index": row.chunk_index,
+            "text": row.text[:300],
+            "score": float(row.rank),
+        }
+        for row in rows
+    ]
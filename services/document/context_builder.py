@@ -0,0 +1,146 @@
+"""
+Contexto compacto para la extracción de metadatos con Gemini.
+
+En lugar de la sentencia completa se envía:
+- la cabecera (donde está el número de expediente),
+- la parte resolutiva ("FALLA", "RESUELVE", ...), donde está el veredicto,
+- solo las oraciones que citan jurisprudencia ("Casación", "R.N.", "STC", "Exp.", ...),
+todo dentro de un presupuesto de tokens, así la latencia y el costo de Gemini
+no crecen con el largo del documento.
+"""
+
+import os
+import re
+
+METADATA_CONTEXT_ENABLED = os.getenv("METADATA_CONTEXT_ENABLED", "true").lower() == "true"
+METADATA_CONTEXT_MAX_TOKENS = int(os.getenv("METADATA_CONTEXT_MAX_TOKENS", 4000))
+METADATA_CONTEXT_HEADER_WORDS = int(os.getenv("METADATA_CONTEXT_HEADER_WORDS", 300))
+METADATA_CONTEXT_RESOLUTIVA_WORDS = int(os.getenv("METADATA_CONTEXT_RESOLUTIVA_WORDS", 500))
+
+# Aproximación de tokens de Gemini para texto en español
+CARACTERES_POR_TOKEN = 4
+
+SEPARADOR = "\n[...]\n"
+
+# Inicio de la parte resolutiva; se toma la última aparición del documento
+PATRON_RESOLUTIVA = re.compile(
+    r"\b(FALLA|FALLO|FALLAMOS|SE RESUELVE|RESUELVE|RESOLVIERON|DECISI[OÓ]N|PARTE RESOLUTIVA)\b"
+)
+
+PATRON_JURISPRUDENCIA = re.compile(
+    r"(\bCasaci[oó]n\b|\bCas\.|\bR\.\s?N\.|\bRecurso de Nulidad\b|\bSTC\b|\bExp\.|"
+    r"\bExpediente\b|\bAcuerdo Plenario\b|\bPleno\b|\bJurisprudencia\b|\bPrecedente\b|"
+    r"\bSentencia (del|de la|recaída)\b)",
+    re.IGNORECASE,
+)
+
+# Fin de oración: punto (o ;) + espacio + mayúscula, salvo abreviaturas cortas como "Exp." o "N."
+_FIN_ORACION = re.compile(r"(?<=[.;])\s+(?=[A-ZÁÉÍÓÚÑ¿\"“(])|\n\s*\n")
+# Abreviaturas tras las que un punto no cierra la oración (también iniciales en
+# mayúscula y "R.N."; un número o una letra minúscula sí pueden cerrarla)
+_ABREVIATURA = re.compile(
+    r"(\b(Exp|Expte|N|Nro|Núm|Art|Arts|Inc|Lit|Num|Cas|Res|Ref|Dr|Dra|Sr|Sra|Pág|pp|Cfr|cit|Ob)"
+    r"|(?-i:\b[A-ZÁÉÍÓÚÑ])|\.\w+)\.$",
+    re.IGNORECASE,
+)
+
+
+def estimar_tokens(texto):
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+def _recortar(texto, max_tokens):
+    limite = max_tokens * CARACTERES_POR_TOKEN
+    if len(texto) <= limite:
+        return texto
+    corte = texto.rfind(" ", 0, limite)
+    return texto[:corte if corte > 0 else limite]
+
+
+def _primeras_palabras(texto, n):
+    """Índice (en caracteres) donde termina la palabra número `n`."""
+    for i, match in enumerate(re.finditer(r"\S+", texto)):
+        if i == n - 1:
+            return match.end()
+    return len(texto)
+
+
+def dividir_oraciones(texto):
+    """Devuelve (inicio, fin) de cada oración, sin cortar en "Exp.", "N.°", "R.N.", etc."""
+    oraciones = []
+    inicio = 0
+    for match in _FIN_ORACION.finditer(texto):
+        previo = texto[inicio:match.start()]
+        es_parrafo = match.group().count("\n") >= 2
+        if not es_parrafo and _ABREVIATURA.search(previo):
+            continue
+        if previo.strip():
+            oraciones.append((inicio, match.start()))
+        inicio = match.end()
+    if texto[inicio:].strip():
+        oraciones.append((inicio, len(texto)))
+    return oraciones
+
+
+def construir_contexto_metadata(texto, max_tokens=METADATA_CONTEXT_MAX_TOKENS, incluir_citas=True):
+    """
+    Devuelve (contexto, stats). `stats` trae los tokens estimados del texto
+    original y del contexto y el ratio de compresión (original / contexto).
+    Con `incluir_citas=False` solo se envían la cabecera y la parte resolutiva.
+    """
+    tokens_originales = estimar_tokens(texto)
+    if not METADATA_CONTEXT_ENABLED or tokens_originales <= max_tokens:
+        return texto, {
+            "original_tokens": tokens_originales,
+            "context_tokens": tokens_originales,
+            "compression_ratio": 1.0,
+        }
+
+    fin_cabecera = _primeras_palabras(texto, METADATA_CONTEXT_HEADER_WORDS)
+    cabecera = _recortar(texto[:fin_cabecera], max_tokens)
+    restante = max_tokens - estimar_tokens(cabecera)
+
+    resolutiva = ""
+    inicio_resolutiva = len(texto)
+    coincidencias = list(PATRON_RESOLUTIVA.finditer(texto, fin_cabecera))
+    if coincidencias and restante > 0:
+        inicio_resolutiva = coincidencias[-1].start()
+        fin = inicio_resolutiva + _primeras_palabras(
+            texto[inicio_resolutiva:], METADATA_CONTEXT_RESOLUTIVA_WORDS
+        )
+        resolutiva = _recortar(texto[inicio_resolutiva:fin], restante)
+        restante -= estimar_tokens(resolutiva)
+
+    # Oraciones con citas, en orden de aparición, hasta agotar el presupuesto
+    citas = []
+    vistas = set()
+    for inicio, fin in dividir_oraciones(texto) if incluir_citas else ():
+        if restante <= 0:
+            break
+        if inicio < fin_cabecera or inicio >= inicio_resolutiva:
+            continue
+        oracion = " ".join(texto[inicio:fin].split())
+        if oracion in vistas or not PATRON_JURISPRUDENCIA.search(oracion):
+            continue
+        costo = estimar_tokens(oracion)
+        if costo > restante:
+            continue
+        vistas.add(oracion)
+        citas.append(oracion)
+        restante -= costo
+
+    partes = [cabecera]
+    if citas:
+        partes.append("\n".join(citas))
+    if resolutiva:
+        partes.append(resolutiva)
+    contexto = SEPARADOR.join(partes)
+
+    tokens_contexto = estimar_tokens(contexto)
+    return contexto, {
+        "original_tokens": tokens_originales,
+        "context_tokens": tokens_contexto,
+        "compression_ratio": round(tokens_originales / tokens_contexto, 2),
+        "citation_sentences": len(citas),
+        "has_resolutiva": bool(resolutiva),
+    }
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import select
+from database.database import fetch_all
+from models.document import Document
+
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", 2048))
+# Red de seguridad para cambios hechos desde otros procesos (workers de jobs)
+DOCUMENT_CACHE_TTL_SECONDS = int(os.getenv("DOCUMENT_CACHE_TTL_SECONDS", 300))
+
+# document_id -> (expira_en, metadata decodificada)
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _lista(valor):
+    return valor if isinstance(valor, list) else []
+
+
+def _metadata(row):
+    return {
+        "id": row.id,
+        "case_number": row.case_number or "",
+        "case_year": row.case_year or "",
+        "crime": row.crime or "",
+        "verdict": row.verdict or "",
+        "cited_jurisprudence": _lista(row.cited_jurisprudence),
+    }
+
+
+def _buscar_en_cache(document_ids, ahora):
+    encontrados = {}
+    faltantes = []
+    with _lock:
+        for doc_id in set(document_ids):
+            entrada = _cache.get(doc_id)
+            if entrada and entrada[0] > ahora:
+                _cache.move_to_end(doc_id)
+                encontrados[doc_id] = entrada[1]
+            else:
+                faltantes.append(doc_id)
+    return encontrados, faltantes
+
+
+def _consulta_faltantes(faltantes):
+    return select(
+        Document.id,
+        Document.case_number,
+        Document.case_year,
+        Document.crime,
+        Document.verdict,
+        Document.cited_jurisprudence,
+    ).where(Document.id.in_(faltantes))
+
+
+def _guardar_en_cache(rows, encontrados, ahora):
+    with _lock:
+        for row in rows:
+            metadata = _metadata(row)
+            encontrados[row.id] = metadata
+            _cache[row.id] = (ahora + DOCUMENT_CACHE_TTL_SECONDS, metadata)
+            _cache.move_to_end(row.id)
+        while len(_cache) > DOCUMENT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return encontrados
+
+
+async def obtener_metadata_documentos_async(document_ids):
+    """
+    Metadata decodificada por id: LRU en memoria y una sola consulta IN para los
+    faltantes, sin bloquear el event loop.
+    """
+    ahora = time.monotonic()
+    encontrados, faltantes = _buscar_en_cache(document_ids, ahora)
+    if not faltantes:
+        return encontrados
+    rows = await fetch_all(_consulta_faltantes(faltantes))
+    return _guardar_en_cache(rows, encontrados, ahora)
+
+
+def invalidar_documento(document_id):
+    with _lock:
+        _cache.pop(document_id, None)
@@ -1,22 +1,144 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session, joinedload, load_only
+from datetime import datetime
 from models.document import Document
-import json
+from models.user import User
+import base64
 
-def save_document(db: Session, metadata, file_path, detected_names=None, uploaded_by=None, is_approved=False):
+# Columnas del listado: nunca se cargan resume ni detected_names
+LIST_COLUMNS = (
+    Document.id,
+    Document.case_number,
+    Document.case_year,
+    Document.crime,
+    Document.verdict,
+    Document.cited_jurisprudence,
+    Document.file_path,
+    Document.created_at,
+)
+
+def save_document(db: Session, metadata, file_path, detected_names=None, uploaded_by=None, is_approved=False, commit=True):
     document = Document(
         case_number=metadata.get("case_number"),
         case_year=metadata.get("case_year"),
         crime=metadata.get("crime"),
         verdict=metadata.get("verdict"),
-        cited_jurisprudence=json.dumps(
-            metadata.get("cited_jurisprudence", []), ensure_ascii=False
-        ),
+        cited_jurisprudence=metadata.get("cited_jurisprudence") or [],
         file_path=file_path,
-        detected_names=json.dumps(detected_names or [], ensure_ascii=False),  # Guarda los nombres como JSON
+        detected_names=detected_names or [],  # JSONB: se guarda la lista tal cual
         uploaded_by=uploaded_by,
         is_approved=is_approved
     )
     db.add(document)
+    if not commit:
+        # El llamador confirma la transacción (p. ej. junto con el job que lo guardó)
+        db.flush()
+        return document
     db.commit()
     db.refresh(document)
-    return document
\ No newline at end of file
+    return document
+
+
+def apply_document_filters(q, filters):
+    # Mismos filtros que en Qdrant (allí se guardan en minúsculas)
+    for key, value in (filters or {}).items():
+        if value is None or value == "":
+            continue
+        column = getattr(Document, key)
+        if isinstance(value, bool):
+            q = q.filter(column == value)
+        else:
+            q = q.filter(func.lower(func.trim(column)) == str(value).strip().lower())
+    return q
+
+
+def _escapar_like(valor):
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def contains_element(column, value, partial=False):
+    """
+    Condición "la lista JSONB `column` contiene `value`". La coincidencia exacta
+    usa `@>` (índice GIN); `partial=True` busca el texto dentro de cada elemento
+    sin distinguir mayúsculas, recorriendo las filas que pasen los demás filtros.
+    """
+    if not partial:
+        return column.contains([value])
+    elemento = func.jsonb_array_elements_text(column).table_valued("value").alias("elemento")
+    return (
+        select(1)
+        .select_from(elemento)
+        .where(elemento.c.value.ilike(f"%{_escapar_like(value)}%", escape="\\"))
+        .exists()
+    )
+
+
+def encode_cursor(doc):
+    raw = f"{doc.created_at.isoformat()}|{doc.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, id) del último documento de la página anterior."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, doc_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(doc_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def _documents_query(db: Session, filters=None, where=()):
+    q = db.query(Document).options(load_only(*LIST_COLUMNS)).filter(*where)
+    return apply_document_filters(q, filters).order_by(
+        Document.created_at.desc(), Document.id.desc()
+    )
+
+
+def list_documents_page(db: Session, limit, cursor=None, filters=None, where=()):
+    """
+    Página de documentos (más recientes primero) por keyset sobre (created_at, id):
+    el costo no depende de cuántas páginas se hayan recorrido.
+    `where` agrega condiciones extra (p. ej. `contains_element`).
+    Devuelve (documentos, next_cursor).
+    """
+    q = _documents_query(db, filters, where)
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        q = q.filter(tuple_(Document.created_at, Document.id) < (created_at, doc_id))
+    docs = q.limit(limit + 1).all()
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+def iter_documents(db: Session, filters=None, batch_size=500):
+    """Todos los documentos del filtro, leídos por lotes con un cursor de servidor."""
+    q = _documents_query(db, filters).execution_options(stream_results=True)
+    yield from q.yield_per(batch_size)
+
+
+def list_pending_page(db: Session, limit, cursor=None):
+    """
+    Cola de aprobación (más antiguos primero) por keyset sobre (created_at, id),
+    con el usuario que subió cada documento en el mismo query (JOIN).
+    Usa el índice parcial ix_documents_pending_created_at. Devuelve (documentos, next_cursor).
+    """
+    q = (
+        db.query(Document)
+        .options(
+            load_only(Document.id, Document.uploaded_by, Document.file_path, Document.created_at),
+            joinedload(Document.uploader).load_only(User.first_name, User.last_name, User.email),
+        )
+        .filter(Document.is_approved == False)
+        .order_by(Document.created_at.asc(), Document.id.asc())
+    )
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        q = q.filter(tuple_(Document.created_at, Document.id) > (created_at, doc_id))
+    docs = q.limit(limit + 1).all()
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+def count_pending(db: Session):
+    return db.query(func.count(Document.id)).filter(Document.is_approved == False).scalar()
@@ -1,18 +1,34 @@
-from services.qdrant.qdrant_service import ensure_collection, upsert_embedding
-from services.qdrant.embeddings_service import get_embedding
+from services.qdrant.qdrant_service import ensure_collection, upsert_embeddings, document_payload
+from services.qdrant.embeddings_service import get_embeddings, chunk_text_by_tokens
+from services.document.chunk_service import save_document_chunks
 
-def save_document_embeddings(document_id, text, chunk_size=250):
+def compute_document_embeddings(text):
+    """Chunks y vectores del texto. Solo depende del texto, no del documento guardado."""
+    # Chunks alineados a la ventana de MiniLM: nada se trunca al embeber
+    chunks = chunk_text_by_tokens(text)
+    # Todos los chunks del documento en pocos lotes
+    return chunks, get_embeddings(chunks)
+
+def store_document_embeddings(document_id, chunks, embeddings, metadata=None, is_approved=True):
+    """Sube a Qdrant y al índice léxico los chunks ya embebidos de un documento."""
     ensure_collection()
-    palabras = text.split()
-    chunks = [" ".join(palabras[i:i+chunk_size]) for i in range(0, len(palabras), chunk_size)]
-    for idx, chunk in enumerate(chunks):
-        embedding = get_embedding(chunk)
+    filtrables = document_payload(metadata or {}, is_approved)
+    points = []
+    for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
         point_id = int(f"{document_id}{idx}")
         payload = {
             "document_id": int(document_id),
             "chunk_index": int(idx),
             "text": chunk[:300],
-            "full_text": chunk
+            "full_text": chunk,
+            **filtrables,
         }
-        upsert_embedding(point_id, embedding, payload)
-    return len(chunks)
\ No newline at end of file
+        points.append((point_id, embedding, payload))
+    upsert_embeddings(points)
+    # Mismos chunks al índice léxico de Postgres (búsqueda híbrida)
+    save_document_chunks(document_id, chunks)
+    return len(chunks)
+
+def save_document_embeddings(document_id, text, metadata=None, is_approved=True):
+    chunks, embeddings = compute_document_embeddings(text)
+    return store_document_embeddings(document_id, chunks, embeddings, metadata, is_approved)
@@ -0,0 +1,83 @@
+import hashlib
+import os
+from datetime import timedelta
+from sqlalchemy import func
+from database.database import SessionLocal
+from models.gemini_cache import GeminiCacheEntry
+
+GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE_ENABLED", "true").lower() == "true"
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+GEMINI_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", 20000))
+
+
+def cache_key(model, prompt, text):
+    digest = hashlib.sha256()
+    for part in (model, prompt, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_cached(key):
+    """Respuesta cacheada y vigente, o None. Actualiza hits y last_used_at."""
+    if not GEMINI_CACHE_ENABLED:
+        return None
+    db = SessionLocal()
+    try:
+        expira = func.now() - timedelta(seconds=GEMINI_CACHE_TTL_SECONDS)
+        entry = (
+            db.query(GeminiCacheEntry)
+            .filter(GeminiCacheEntry.key == key, GeminiCacheEntry.created_at > expira)
+            .first()
+        )
+        if entry is None:
+            return None
+        entry.hits += 1
+        entry.last_used_at = func.now()
+        response = entry.response
+        db.commit()
+        return response
+    except Exception as e:
+        # La caché nunca debe tumbar la llamada a Gemini
+        print(f"Advertencia: error leyendo la caché de Gemini: {e}")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def put_cached(key, model, response):
+    """Guarda la respuesta y aplica la expiración por TTL y el límite de tamaño (LRU)."""
+    if not GEMINI_CACHE_ENABLED:
+        return
+    db = SessionLocal()
+    try:
+        db.merge(
+            GeminiCacheEntry(
+                key=key,
+                model=model,
+                response=response,
+                hits=0,
+                created_at=func.now(),
+                last_used_at=func.now(),
+            )
+        )
+        expira = func.now() - timedelta(seconds=GEMINI_CACHE_TTL_SECONDS)
+        db.query(GeminiCacheEntry).filter(GeminiCacheEntry.created_at <= expira).delete(
+            synchronize_session=False
+        )
+        sobrantes = (
+            db.query(GeminiCacheEntry.key)
+            .order_by(GeminiCacheEntry.last_used_at.desc())
+            .offset(GEMINI_CACHE_MAX_ENTRIES)
+            .subquery()
+        )
+        db.query(GeminiCacheEntry).filter(
+            GeminiCacheEntry.key.in_(db.query(sobrantes.c.key))
+        ).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        print(f"Advertencia: error guardando en la caché de Gemini: {e}")
+        db.rollback()
+    finally:
+        db.close()
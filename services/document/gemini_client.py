@@ -0,0 +1,225 @@
+"""
+Cliente de Gemini con timeout por llamada, concurrencia acotada, reintentos con
+backoff + jitter y circuit breaker.
+
+Todas las llamadas salientes del proceso pasan por el mismo semáforo y el mismo
+breaker: si Gemini está lento o caído, las peticiones fallan rápido con
+`GeminiNoDisponible` en lugar de ocupar todos los hilos esperando.
+
+El semáforo y el breaker viven en memoria y son por proceso: la API y cada
+worker de jobs (`JOB_WORKERS`) tienen los suyos. El máximo de llamadas
+simultáneas a Gemini de todo el despliegue es GEMINI_MAX_CONCURRENCY por el
+número de procesos, y cada proceso abre su circuito con sus propios errores.
+
+Con `GEMINI_API_ENDPOINT=http://localhost:8089` el SDK habla REST contra ese
+host (p. ej. un servidor falso de Gemini para pruebas locales).
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+from services.document.gemini_cache import cache_key, get_cached, put_cached
+
+load_dotenv()
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash-lite")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 60))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 4))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 2))
+GEMINI_RETRY_BASE_SECONDS = float(os.getenv("GEMINI_RETRY_BASE_SECONDS", 1))
+GEMINI_RETRY_MAX_SECONDS = float(os.getenv("GEMINI_RETRY_MAX_SECONDS", 20))
+# Circuit breaker: se abre si en las últimas N llamadas la tasa de error supera el umbral
+GEMINI_BREAKER_WINDOW = int(os.getenv("GEMINI_BREAKER_WINDOW", 20))
+GEMINI_BREAKER_MIN_CALLS = int(os.getenv("GEMINI_BREAKER_MIN_CALLS", 5))
+GEMINI_BREAKER_FAILURE_RATE = float(os.getenv("GEMINI_BREAKER_FAILURE_RATE", 0.5))
+GEMINI_BREAKER_COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", 30))
+
+# Códigos HTTP que vale la pena reintentar
+_CODIGOS_REINTENTABLES = {408, 429, 500, 502, 503, 504}
+
+_genai = None
+_lock = threading.Lock()
+
+
+class GeminiNoDisponible(Exception):
+    """Gemini no respondió (timeout, errores repetidos o circuito abierto)."""
+
+
+class GeminiSaturado(GeminiNoDisponible):
+    """
+    No hubo cupo local (semáforo del proceso) dentro del timeout. No es una falla
+    de Gemini: no cuenta para el breaker ni se reintenta.
+    """
+
+
+def get_genai():
+    """SDK de Gemini configurado una sola vez por proceso, en el primer uso."""
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                opciones = {"api_key": os.getenv("GEMINI_API_KEY")}
+                if GEMINI_API_ENDPOINT:
+                    opciones["client_options"] = {"api_endpoint": GEMINI_API_ENDPOINT}
+                    opciones["transport"] = "rest"
+                genai.configure(**opciones)
+                _genai = genai
+    return _genai
+
+
+# ============================================================================
+# CIRCUIT BREAKER
+# ============================================================================
+
+class CircuitBreaker:
+    """
+    Breaker por tasa de error sobre una ventana deslizante de llamadas.
+    cerrado -> abierto (falla rápido durante `cooldown`) -> semiabierto (deja
+    pasar una llamada de prueba) -> cerrado si sale bien, abierto si no.
+    """
+
+    def __init__(self, window, min_calls, failure_rate, cooldown):
+        self.window = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.abierto_hasta = 0.0
+        self.prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self.abierto_hasta == 0.0:
+                return "closed"
+            return "open" if time.monotonic() < self.abierto_hasta else "half_open"
+
+    def permitir(self):
+        with self._lock:
+            if self.abierto_hasta == 0.0:
+                return True
+            if time.monotonic() < self.abierto_hasta or self.prueba_en_curso:
+                return False
+            self.prueba_en_curso = True
+            return True
+
+    def registrar(self, exito):
+        with self._lock:
+            if self.prueba_en_curso:
+                self.prueba_en_curso = False
+                if exito:
+                    self.abierto_hasta = 0.0
+                    self.window.clear()
+                else:
+                    self.abierto_hasta = time.monotonic() + self.cooldown
+                return
+            self.window.append(exito)
+            fallos = self.window.count(False)
+            if (
+                len(self.window) >= self.min_calls
+                and fallos / len(self.window) >= self.failure_rate
+            ):
+                self.abierto_hasta = time.monotonic() + self.cooldown
+                self.window.clear()
+
+
+breaker = CircuitBreaker(
+    GEMINI_BREAKER_WINDOW,
+    GEMINI_BREAKER_MIN_CALLS,
+    GEMINI_BREAKER_FAILURE_RATE,
+    GEMINI_BREAKER_COOLDOWN_SECONDS,
+)
+# Límite de llamadas simultáneas a Gemini en este proceso (no es global al despliegue)
+_semaforo = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+
+
+# ============================================================================
+# LLAMADAS
+# ============================================================================
+
+def _es_reintentable(error):
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    codigo = getattr(error, "code", None)
+    # Errores de red del transporte no traen código HTTP
+    return codigo is None or codigo in _CODIGOS_REINTENTABLES
+
+
+def _espera_reintento(intento):
+    # Backoff exponencial con "full jitter"
+    tope = min(GEMINI_RETRY_MAX_SECONDS, GEMINI_RETRY_BASE_SECONDS * 2 ** intento)
+    return random.uniform(0, tope)
+
+
+def _llamar(prompt, model, timeout):
+    # El cupo se toma antes de consultar el breaker: esperar a otros hilos de este
+    # proceso no es una falla de Gemini ni debe gastar la llamada de prueba del
+    # estado semiabierto
+    if not _semaforo.acquire(timeout=timeout):
+        raise GeminiSaturado("Sin cupo local para llamar a Gemini")
+    try:
+        if not breaker.permitir():
+            raise GeminiNoDisponible("Circuito abierto: Gemini está fallando, se omite la llamada")
+        try:
+            # retry=None: sin los reintentos propios del SDK (reintenta 503 hasta 600 s
+            # ignorando el timeout); los reintentos y el breaker son los de este módulo
+            response = get_genai().GenerativeModel(model).generate_content(
+                prompt, request_options={"timeout": timeout, "retry": None}
+            )
+        except Exception as e:
+            # Un 4xx indica que Gemini responde: no cuenta como falla para el breaker
+            breaker.registrar(not _es_reintentable(e))
+            raise
+        breaker.registrar(True)
+        return response
+    finally:
+        _semaforo.release()
+
+
+def generate_content(prompt, model=GEMINI_MODEL, timeout=GEMINI_TIMEOUT_SECONDS,
+                     max_retries=GEMINI_MAX_RETRIES):
+    """Llamada bloqueante con timeout, reintentos y circuit breaker."""
+    for intento in range(max_retries + 1):
+        try:
+            return _llamar(prompt, model, timeout)
+        except GeminiNoDisponible:
+            # Circuito abierto o sin cupo local: se falla rápido, sin reintentar
+            raise
+        except Exception as e:
+            if not _es_reintentable(e):
+                raise
+            if intento == max_retries:
+                raise GeminiNoDisponible(f"Gemini no respondió tras {intento + 1} intentos: {e}") from e
+            # El cupo ya se liberó: la espera no bloquea a otros hilos
+            time.sleep(_espera_reintento(intento))
+
+
+def generate_text(prompt, text, model=GEMINI_MODEL, cacheable=None):
+    """
+    Texto generado para `prompt + text`, leído a través de la caché persistente.
+    Devuelve (respuesta, cache_hit). `cacheable(respuesta)` decide si una
+    respuesta se guarda (p. ej. solo si es JSON válido).
+    """
+    key = cache_key(model, prompt, text)
+    cached = get_cached(key)
+    if cached is not None:
+        return cached, True
+    response = generate_content(prompt + text, model=model).text
+    if cacheable is None or cacheable(response):
+        put_cached(key, model, response)
+    return response, False
+
+
+def gemini_status():
+    return {
+        "breaker": breaker.estado,
+        # Por proceso: cada worker de jobs tiene su propio límite y su propio breaker
+        "max_concurrency_per_process": GEMINI_MAX_CONCURRENCY,
+        "timeout_seconds": GEMINI_TIMEOUT_SECONDS,
+    }
@@ -0,0 +1,122 @@
+"""
+Extracción local (sin red) de los campos con formato fijo:
+número de expediente, año y jurisprudencia citada.
+
+Los expedientes judiciales peruanos siguen el formato
+``número-año-incidente-distrito-órgano-especialidad-juzgado``
+(p. ej. "11468-2018-44-0401-JR-PE-01") y las citas usan fórmulas estables
+("Casación N.° 123-2019/Lima", "R.N. N.° 456-2017 Lima", "STC Exp. N.° 00728-2008-PHC/TC",
+"Acuerdo Plenario N.° 2-2005/CJ-116"). Los campos que requieren criterio
+(delito y veredicto) quedan para Gemini.
+"""
+
+import re
+
+# Palabras del inicio del documento donde se busca el número de expediente
+PALABRAS_CABECERA = 150
+
+_NUMERO = r"N(?:ro|[°º]|\.\s?[°º]|\.)?\.?\s*"
+
+# Formato completo del expediente (Código Procesal Penal / sistema SIJ)
+PATRON_EXPEDIENTE_COMPLETO = re.compile(
+    r"\b(\d{1,6})-((?:19|20)\d{2})-(\d{1,4})-(\d{4})-([A-Z]{2})-([A-Z]{2})-(\d{1,2})\b"
+)
+# "EXPEDIENTE N° 123-2019-..." / "EXP. N.° 00728-2008-PHC/TC"
+PATRON_EXPEDIENTE_ROTULO = re.compile(
+    r"\bEXP(?:EDIENTE|TE)?\.?\s*" + _NUMERO + r":?\s*(\d{1,6}-((?:19|20)\d{2})[\w\-/]*)",
+    re.IGNORECASE,
+)
+
+# Sede de la cita ("/Lima", "-Arequipa", " La Libertad"); sensible a mayúsculas
+# para no tomar la palabra siguiente de la oración
+_LUGAR = (
+    r"(?-i:(?:\s*[/\-]\s*|\s+)"
+    r"(?!(?:El|Los|Las|En|Se|Que|Al|Del|Este|Esta|Dicha|Dicho|Asimismo)\b)(?!La\s(?!Libertad))"
+    r"[A-ZÁÉÍÓÚÑ][\wÁÉÍÓÚÑáéíóúñ]+"
+    r"(?:\s(?:del|de)\s[A-ZÁÉÍÓÚÑ][\wáéíóúñ]+|\s[A-ZÁÉÍÓÚÑ][\wáéíóúñ]+)?)"
+)
+
+PATRONES_JURISPRUDENCIA = [
+    # Casación N.° 123-2019/Lima, Cas. N° 123-2019-Lima
+    re.compile(
+        r"\b(?:Casaci[oó]n|Cas\.)\s*(?:" + _NUMERO + r")?\d{1,6}-(?:19|20)\d{2}(?:" + _LUGAR + r")?",
+        re.IGNORECASE,
+    ),
+    # R.N. N.° 456-2017 Lima, Recurso de Nulidad N.° 456-2017/Lima
+    re.compile(
+        r"\b(?:R\.\s?N\.|Recurso de Nulidad)\s*(?:" + _NUMERO + r")?\d{1,6}-(?:19|20)\d{2}(?:" + _LUGAR + r")?",
+        re.IGNORECASE,
+    ),
+    # STC Exp. N.° 00728-2008-PHC/TC, Exp. N.° 1234-2004-AA/TC
+    re.compile(
+        r"\b(?:STC\s*)?(?:Exp(?:ediente)?\.?\s*)?" + _NUMERO + r"\d{1,6}-(?:19|20)\d{2}-[A-Z]{2,4}/TC\b",
+        re.IGNORECASE,
+    ),
+    # Acuerdo Plenario N.° 2-2005/CJ-116
+    re.compile(
+        r"\bAcuerdo Plenario\s*" + _NUMERO + r"\d{1,3}-(?:19|20)\d{2}(?:/[A-Z]{2,4}-\d{2,3})?",
+        re.IGNORECASE,
+    ),
+    # Sentencia Plenaria Casatoria N.° 1-2018/CIJ-433
+    re.compile(
+        r"\bSentencia Plenaria(?: Casatoria)?\s*" + _NUMERO + r"\d{1,3}-(?:19|20)\d{2}(?:/[A-Z]{2,4}-\d{2,3})?",
+        re.IGNORECASE,
+    ),
+]
+
+
+def _cabecera(texto, palabras=PALABRAS_CABECERA):
+    match = None
+    for i, match in enumerate(re.finditer(r"\S+", texto)):
+        if i == palabras - 1:
+            break
+    return texto[:match.end()] if match else texto
+
+
+def extraer_numero_expediente(texto):
+    """Devuelve (case_number, case_year) del inicio del documento o ("", "")."""
+    cabecera = _cabecera(texto)
+    for patron in (PATRON_EXPEDIENTE_COMPLETO, PATRON_EXPEDIENTE_ROTULO):
+        match = patron.search(cabecera)
+        if match:
+            numero = match.group(0) if patron is PATRON_EXPEDIENTE_COMPLETO else match.group(1)
+            return numero.rstrip("-/"), match.group(2)
+    return "", ""
+
+
+def extraer_jurisprudencia(texto, excluir=()):
+    """Citas a jurisprudencia en orden de aparición, tal como están en el texto."""
+    encontradas = []
+    for patron in PATRONES_JURISPRUDENCIA:
+        for match in patron.finditer(texto):
+            encontradas.append((match.start(), match.end()))
+
+    # Se quedan las coincidencias más largas cuando dos patrones se solapan
+    encontradas.sort(key=lambda r: (r[0], -r[1]))
+    citas = []
+    vistas = set(excluir)
+    fin_anterior = -1
+    for inicio, fin in encontradas:
+        if inicio < fin_anterior:
+            continue
+        cita = " ".join(texto[inicio:fin].split()).rstrip(".,;:")
+        fin_anterior = fin
+        clave = cita.lower()
+        if clave in vistas or any(e and e in cita for e in excluir):
+            continue
+        vistas.add(clave)
+        citas.append(cita)
+    return citas
+
+
+def extraer_metadata_local(texto):
+    """
+    Campos de formato fijo: case_number, case_year y cited_jurisprudence.
+    Los que no se encuentran quedan vacíos.
+    """
+    case_number, case_year = extraer_numero_expediente(texto)
+    return {
+        "case_number": case_number,
+        "case_year": case_year,
+        "cited_jurisprudence": extraer_jurisprudencia(texto, excluir=(case_number,)),
+    }
@@ -1,32 +1,107 @@
 import json
-from constants.prompts import DOCUMENT_EXTRACTION_PROMPT
-import google.generativeai as genai
 import os
-from dotenv import load_dotenv
+import time
+from constants.prompts import DOCUMENT_EXTRACTION_PROMPT, DOCUMENT_JUDGMENT_PROMPT
+from services.document.gemini_client import generate_text
+from services.document.context_builder import construir_contexto_metadata
+from services.document.metadata_rules import extraer_metadata_local
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+METADATA_RULES_ENABLED = os.getenv("METADATA_RULES_ENABLED", "true").lower() == "true"
 
-def extract_metadata(text):
-    prompt = DOCUMENT_EXTRACTION_PROMPT + text
-    response = genai.GenerativeModel("models/gemini-2.5-flash-lite").generate_content(
-        prompt
-    )
-    raw = response.text.strip()
+def _limpiar_json(raw):
+    raw = raw.strip()
     if raw.startswith("```"):
         raw = raw.split("```")[1]
         if raw.strip().startswith("json"):
             raw = raw.strip()[4:]
+    return raw
+
+def _es_json_valido(raw):
+    try:
+        json.loads(_limpiar_json(raw))
+        return True
+    except Exception:
+        return False
+
+def _consultar_gemini(prompt, text, incluir_citas):
+    # Solo cabecera, parte resolutiva y citas: el prompt no crece con el documento
+    contexto, stats = construir_contexto_metadata(text, incluir_citas=incluir_citas)
+    print(
+        f"Contexto de metadatos: {stats['context_tokens']}/{stats['original_tokens']} "
+        f"tokens (x{stats['compression_ratio']})"
+    )
+    # Solo se cachean respuestas que se puedan parsear
+    response, cache_hit = generate_text(prompt, contexto, cacheable=_es_json_valido)
+    raw = _limpiar_json(response)
     try:
         data = json.loads(raw)
         print("Parsed metadata:", data)
     except Exception as e:
         print("Error parsing Gemini response:", e)
-        data = {
-            "case_number": "",
-            "case_year": "",
-            "crime": "",
-            "verdict": "",
-            "cited_jurisprudence": [],
-        }
-    return data
\ No newline at end of file
+        data = {}
+    return data, cache_hit, stats
+
+def _unir_citas(locales, gemini):
+    citas = list(locales)
+    vistas = {c.lower() for c in citas}
+    for cita in gemini or []:
+        if isinstance(cita, str) and cita.lower() not in vistas:
+            vistas.add(cita.lower())
+            citas.append(cita)
+    return citas
+
+def extract_metadata(text, with_info=False):
+    """
+    Metadatos del documento. El expediente, el año y las citas se extraen con
+    reglas locales; Gemini solo decide delito y veredicto (o todo, si las reglas
+    no encuentran el expediente). Un fallo de Gemini no impide devolver los
+    campos que las reglas sí encontraron.
+
+    Con `with_info=True` devuelve (data, info): `cache_hit`, estadísticas del
+    contexto enviado, campos resueltos localmente y el error de Gemini, si hubo.
+    """
+    inicio = time.time()
+    locales = extraer_metadata_local(text) if METADATA_RULES_ENABLED else {}
+    info = {
+        "cache_hit": False,
+        "context": None,
+        "local_fields": [campo for campo, valor in locales.items() if valor],
+        "rules_ms": round((time.time() - inicio) * 1000, 2),
+        "gemini_error": None,
+    }
+
+    data = {
+        "case_number": "",
+        "case_year": "",
+        "crime": "",
+        "verdict": "",
+        "cited_jurisprudence": [],
+    }
+    reducido = bool(locales.get("case_number"))
+    try:
+        if reducido:
+            respuesta, info["cache_hit"], info["context"] = _consultar_gemini(
+                DOCUMENT_JUDGMENT_PROMPT, text, incluir_citas=False
+            )
+        else:
+            respuesta, info["cache_hit"], info["context"] = _consultar_gemini(
+                DOCUMENT_EXTRACTION_PROMPT, text, incluir_citas=True
+            )
+        data.update(respuesta)
+    except Exception as e:
+        # Lo que encontraron las reglas (expediente o solo citas) se conserva igual
+        print(f"Gemini no disponible, se usan solo los campos locales: {e}")
+        info["gemini_error"] = str(e)
+
+    # Las reglas tienen prioridad en los campos de formato fijo
+    if locales.get("case_number"):
+        data["case_number"] = locales["case_number"]
+        data["case_year"] = locales["case_year"]
+    if locales.get("cited_jurisprudence"):
+        data["cited_jurisprudence"] = _unir_citas(
+            locales["cited_jurisprudence"], data.get("cited_jurisprudence")
+        )
+
+    if with_info:
+        return data, info
+    return data
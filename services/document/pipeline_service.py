@@ -0,0 +1,647 @@
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from database.database import SessionLocal
+from models.document import Document
+from services.pdf.pdf_service import ParsedPDF, parse_pdf
+from services.document.metadata_service import extract_metadata
+from services.document.document_service import save_document
+from services.document.document_cache import invalidar_documento
+from services.document.embedding_service import (
+    compute_document_embeddings,
+    store_document_embeddings,
+)
+from services.pdf.spacy_service import extraer_personas_ambos_casos
+from services.pdf.name_filter_service import filtrar_nombres, normalizar_nombre
+from services.pdf.name_index import obtener_indice_nombres
+from services.pdf.censorship_service import censurar_pdf_con_rectangulos
+from services.executor_service import PROCESS_POOLS_ENABLED, run_in_pool
+from services.file_service import eliminar_archivo, ruta_unica
+from services.jobs.job_service import assign_job_document
+
+METADATA_VACIA = {
+    "case_number": "",
+    "case_year": "",
+    "crime": "",
+    "verdict": "",
+    "cited_jurisprudence": [],
+}
+
+
+class PipelineError(Exception):
+    """Error de una etapa del pipeline con el status HTTP que le corresponde."""
+
+    def __init__(self, msg, status_code=500, stage=None):
+        super().__init__(msg)
+        self.msg = msg
+        self.status_code = status_code
+        self.stage = stage
+
+
+class Cronometro:
+    """
+    Mide cada etapa y avisa a `on_stage(etapas_en_curso, timings)` cuando una
+    empieza o termina. `on_stage` puede bloquear (p. ej. el UPDATE del job): corre
+    en un hilo y los avisos van de a uno, en orden, sin frenar el event loop.
+    """
+
+    def __init__(self, on_stage=None):
+        self.timings = {}
+        self.on_stage = on_stage
+        self.en_curso = set()
+        self.completadas = set()
+        self._aviso = asyncio.Lock()
+
+    async def _avisar(self):
+        if not self.on_stage:
+            return
+        async with self._aviso:
+            try:
+                await asyncio.to_thread(self.on_stage, sorted(self.en_curso), dict(self.timings))
+            except Exception as e:
+                # El progreso es informativo: no hace fallar el documento
+                print(f"Advertencia: no se pudo registrar el progreso: {e}")
+
+    @asynccontextmanager
+    async def etapa(self, nombre):
+        self.en_curso.add(nombre)
+        await self._avisar()
+        inicio = time.time()
+        try:
+            yield
+        except PipelineError as e:
+            e.stage = e.stage or nombre
+            raise
+        finally:
+            self.timings[nombre] = round(time.time() - inicio, 3)
+            self.en_curso.discard(nombre)
+        self.completadas.add(nombre)
+        await self._avisar()
+
+
+class GrafoEtapas:
+    """
+    Etapas del pipeline con sus dependencias. Cada etapa arranca en cuanto
+    terminan las suyas, así las independientes (Gemini, NER, embeddings) corren
+    a la vez y la latencia total es la del camino crítico, no la suma.
+
+    `fn(*resultados_de_dependencias)` debe devolver un awaitable.
+    """
+
+    def __init__(self, crono):
+        self.crono = crono
+        self._etapas = {}
+
+    def etapa(self, nombre, fn, *dependencias):
+        faltantes = [d for d in dependencias if d not in self._etapas]
+        if faltantes:
+            raise ValueError(f"La etapa {nombre} depende de etapas no declaradas: {faltantes}")
+        self._etapas[nombre] = (fn, dependencias)
+
+    async def ejecutar(self):
+        """Ejecuta todas las etapas y devuelve {nombre: resultado}."""
+        tareas = {}
+
+        async def correr(nombre):
+            fn, dependencias = self._etapas[nombre]
+            entradas = [await tareas[d] for d in dependencias]
+            async with self.crono.etapa(nombre):
+                return await fn(*entradas)
+
+        for nombre in self._etapas:
+            tareas[nombre] = asyncio.ensure_future(correr(nombre))
+        try:
+            await asyncio.gather(*tareas.values())
+        except BaseException:
+            # Si una etapa falla, las que siguen en curso ya no sirven
+            for tarea in tareas.values():
+                tarea.cancel()
+            await asyncio.gather(*tareas.values(), return_exceptions=True)
+            raise
+        return {nombre: tarea.result() for nombre, tarea in tareas.items()}
+
+
+async def _o_falla(mensaje, awaitable):
+    """Convierte cualquier error de la etapa en un PipelineError con `mensaje`."""
+    try:
+        return await awaitable
+    except PipelineError:
+        raise
+    except Exception as e:
+        raise PipelineError(f"{mensaje}: {e}")
+
+
+def _extraer_metadata(text):
+    """Devuelve (metadata, gemini_success, info, gemini_error)."""
+    try:
+        metadata, info = extract_metadata(text, with_info=True)
+        # Con los campos locales la metadata puede estar completa aunque Gemini falle
+        return metadata, info["gemini_error"] is None, info, info["gemini_error"]
+    except Exception as e:
+        print(f"Error extrayendo metadatos con Gemini: {e}")
+        return dict(METADATA_VACIA), False, {"cache_hit": False, "context": None, "local_fields": []}, str(e)
+
+
+def _detectar_nombres(texto):
+    """NER + deduplicación + filtrado. Devuelve (nombres_a_censurar, total_detectados)."""
+    # Solo el texto viaja al pool: el NER no usa las cajas de palabras
+    personas_minusculas, personas_normal = extraer_personas_ambos_casos(
+        ParsedPDF(path="", pages=[], text=texto)
+    )
+    todas_personas = sorted(set(personas_minusculas + personas_normal))
+
+    # Deduplicate by normalization
+    personas_normalizadas = {}
+    for persona in todas_personas:
+        persona_norm = normalizar_nombre(persona)
+        if persona_norm not in personas_normalizadas:
+            personas_normalizadas[persona_norm] = persona
+    todas_personas_unicas = list(personas_normalizadas.values())
+
+    resultado = filtrar_nombres(
+        todas_personas_unicas,
+        obtener_indice_nombres(),
+        personas_minusculas,
+        personas_normal,
+        umbral_minimo=8,
+    )
+    return resultado["nombres_originales_a_censurar"], len(todas_personas_unicas)
+
+
+def _calcular_embeddings(text):
+    """Devuelve ((chunks, vectores), None) o (None, error): un fallo aquí no aborta el pipeline."""
+    try:
+        return compute_document_embeddings(text), None
+    except Exception as e:
+        print(f"Error computing embeddings: {str(e)}")
+        return None, str(e)
+
+
+def _process_embeddings(document_id, calculados, metadata=None):
+    vectores, error = calculados
+    if vectores is None:
+        return 0, f"⚠️ Error saving embeddings: {error}"
+    try:
+        chunks, embeddings = vectores
+        num_chunks = store_document_embeddings(document_id, chunks, embeddings, metadata=metadata)
+        return num_chunks, f"✅ {num_chunks} chunks saved in Qdrant"
+    except Exception as e:
+        print(f"Error saving embeddings: {str(e)}")
+        return 0, f"⚠️ Error saving embeddings: {str(e)}"
+
+
+async def _hasta_terminar(trabajo):
+    """
+    Espera el trabajo de un pool o de un hilo. Si la etapa se cancela porque otra
+    falló, el proceso o el hilo sigue corriendo: se espera a que termine antes de
+    propagar la cancelación, así nada escribe archivos después de la limpieza.
+    """
+    tarea = asyncio.ensure_future(trabajo)
+    try:
+        return await asyncio.shield(tarea)
+    except asyncio.CancelledError:
+        await asyncio.gather(tarea, return_exceptions=True)
+        raise
+
+
+class EjecutorEtapas:
+    """
+    Decide dónde corre cada etapa. En la API (`usar_pools=True`) las etapas CPU
+    van a los pools de procesos; en los workers de jobs corren en hilos del
+    propio proceso. Las de I/O siempre van a hilos, así el event loop queda
+    libre y el grafo puede solaparlas.
+
+    Lo que va a un pool se serializa: cada etapa recibe solo lo que usa (el
+    texto, o la ruta del PDF) y no el ParsedPDF completo con sus cajas de palabras.
+    """
+
+    def __init__(self, usar_pools=True):
+        self.usar_pools = usar_pools and PROCESS_POOLS_ENABLED
+
+    async def parse(self, file_path):
+        # Las cajas de palabras solo se guardan si la censura corre en este proceso
+        return await self.cpu("nlp", parse_pdf, file_path, with_words=not self.usar_pools)
+
+    def compartir(self, pdf):
+        """El ParsedPDF para la censura si corre en este proceso; en un pool, None (relee el PDF)."""
+        return None if self.usar_pools else pdf
+
+    async def cpu(self, pool, fn, *args, **kwargs):
+        if self.usar_pools:
+            return await _hasta_terminar(run_in_pool(pool, fn, *args, **kwargs))
+        return await _hasta_terminar(asyncio.to_thread(fn, *args, **kwargs))
+
+    async def io(self, fn, *args, **kwargs):
+        return await _hasta_terminar(asyncio.to_thread(fn, *args, **kwargs))
+
+
+def _guardar_documento(metadata, censored_path, nombres_a_censurar, user_id, job_id=None):
+    db = SessionLocal()
+    try:
+        document = save_document(
+            db,
+            metadata,
+            censored_path,
+            detected_names=nombres_a_censurar,
+            uploaded_by=user_id,
+            is_approved=True,
+            commit=False,
+        )
+        if job_id:
+            assign_job_document(db, job_id, document.id)
+        db.commit()
+        return document.id
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _leer_documento_guardado(document_id):
+    db = SessionLocal()
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            return None
+        return {
+            "file_path": document.file_path,
+            "detected_names": list(document.detected_names or []),
+            "metadata": {
+                "case_number": document.case_number or "",
+                "case_year": document.case_year or "",
+                "crime": document.crime or "",
+                "verdict": document.verdict or "",
+                "cited_jurisprudence": list(document.cited_jurisprudence or []),
+            },
+        }
+    finally:
+        db.close()
+
+
+def _nueva_ruta_aprobada():
+    # Timestamp para ordenar + uuid: dos workers que terminan en el mismo segundo no se pisan
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return ruta_unica(os.path.join("uploaded_docs", "approved"), prefijo=f"{timestamp}_")
+
+
+async def _ejecutar_o_limpiar(grafo, crono, censored_path):
+    """
+    Ejecuta el grafo. Si falla antes de guardar el documento, borra la copia
+    censurada: al volver, ninguna etapa sigue corriendo (ver `_hasta_terminar`).
+    """
+    try:
+        return await grafo.ejecutar()
+    except BaseException:
+        if "save_document" not in crono.completadas:
+            eliminar_archivo(censored_path)
+        raise
+
+
+def _msg_metadata(gemini_success, local_fields=()):
+    if gemini_success:
+        return "✅ Metadatos extraídos correctamente"
+    if local_fields:
+        return "⚠️ Error de Gemini, solo se extrajeron " + ", ".join(local_fields)
+    return "⚠️ Error extrayendo metadatos, campos vacíos"
+
+
+async def _retomar_indexado(document_id, crono, ejecutor):
+    """
+    Reintento de un job cuyo documento ya quedó guardado (el worker cayó después
+    del commit): no se vuelve a insertar ni a censurar, solo se indexa. Los ids
+    de los puntos son fijos por documento y chunk, así reindexar no duplica.
+    """
+    guardado = await ejecutor.io(_leer_documento_guardado, document_id)
+    if not guardado:
+        raise PipelineError("Documento del job no encontrado", status_code=404)
+
+    grafo = GrafoEtapas(crono)
+    # El PDF censurado conserva el texto: los chunks son los mismos del original
+    grafo.etapa(
+        "parse_pdf",
+        lambda: _o_falla(
+            "Error extrayendo texto del PDF",
+            ejecutor.parse(guardado["file_path"]),
+        ),
+    )
+    grafo.etapa(
+        "embeddings",
+        lambda pdf: ejecutor.cpu("embedding", _calcular_embeddings, pdf.text),
+        "parse_pdf",
+    )
+    grafo.etapa(
+        "index",
+        lambda calculados: ejecutor.io(
+            _process_embeddings, document_id, calculados, guardado["metadata"]
+        ),
+        "embeddings",
+    )
+    resultados = await grafo.ejecutar()
+    invalidar_documento(document_id)
+    num_chunks, embedding_msg = resultados["index"]
+
+    return {
+        "metadata": guardado["metadata"],
+        "document_id": document_id,
+        "file_url": f"/documents/download/{document_id}",
+        "detected_names": guardado["detected_names"],
+        "total_names_censored": len(guardado["detected_names"]),
+        "timings": crono.timings,
+        "msg": f"Documento guardado en un intento anterior, solo se reindexó | {embedding_msg}",
+        "resumed": True,
+    }
+
+
+async def analizar_documento_async(file_path, user_id, on_stage=None, usar_pools=True,
+                                   job_id=None, document_id=None):
+    """
+    Pipeline de /analyze_pdf: analiza, censura y guarda un PDF ya subido.
+
+    parse_pdf ─┬─ metadata (Gemini) ─────────────┐
+               ├─ names ── censorship ── save_document ── index
+               └─ embeddings ───────────────────────────┘
+
+    `job_id` se anota junto con el documento guardado; si el job ya tiene
+    `document_id` (reintento tras una caída) solo falta indexar.
+    """
+    crono = Cronometro(on_stage)
+    ejecutor = EjecutorEtapas(usar_pools)
+    if document_id is not None:
+        resultado = await _retomar_indexado(document_id, crono, ejecutor)
+        eliminar_archivo(file_path)
+        return resultado
+
+    total_start = time.time()
+    if isinstance(user_id, str):
+        user_id = uuid.UUID(user_id)
+    censored_path = _nueva_ruta_aprobada()
+
+    grafo = GrafoEtapas(crono)
+    # Parse PDF once; every stage reuses the parsed pages and text
+    grafo.etapa("parse_pdf", lambda: ejecutor.parse(file_path))
+    grafo.etapa(
+        "metadata", lambda pdf: ejecutor.io(_extraer_metadata, pdf.text), "parse_pdf"
+    )
+    grafo.etapa(
+        "names", lambda pdf: ejecutor.cpu("nlp", _detectar_nombres, pdf.text), "parse_pdf"
+    )
+    grafo.etapa(
+        "embeddings",
+        lambda pdf: ejecutor.cpu("embedding", _calcular_embeddings, pdf.text),
+        "parse_pdf",
+    )
+    # Censor PDF and save with timestamp
+    grafo.etapa(
+        "censorship",
+        lambda pdf, nombres: ejecutor.cpu(
+            "nlp",
+            censurar_pdf_con_rectangulos,
+            file_path,
+            censored_path,
+            nombres[0],
+            documento=ejecutor.compartir(pdf),
+        ),
+        "parse_pdf",
+        "names",
+    )
+    # Save document to PostgreSQL with censored PDF path and detected names
+    grafo.etapa(
+        "save_document",
+        lambda meta, nombres, _: ejecutor.io(
+            _guardar_documento, meta[0], censored_path, nombres[0], user_id, job_id
+        ),
+        "metadata",
+        "names",
+        "censorship",
+    )
+    grafo.etapa(
+        "index",
+        lambda document_id, meta, calculados: ejecutor.io(
+            _process_embeddings, document_id, calculados, meta[0]
+        ),
+        "save_document",
+        "metadata",
+        "embeddings",
+    )
+    resultados = await _ejecutar_o_limpiar(grafo, crono, censored_path)
+    # El PDF subido sin censurar ya no hace falta: queda solo la copia censurada
+    eliminar_archivo(file_path)
+
+    metadata, gemini_success, metadata_info, gemini_error = resultados["metadata"]
+    nombres_a_censurar, total_detectados = resultados["names"]
+    document_id = resultados["save_document"]
+    num_chunks, embedding_msg = resultados["index"]
+
+    return {
+        "metadata": metadata,
+        "document_id": document_id,
+        "file_url": f"/documents/download/{document_id}",
+        "detected_names": nombres_a_censurar,
+        "total_names_detected": total_detectados,
+        "total_names_censored": len(nombres_a_censurar),
+        "gemini_processing_time_seconds": crono.timings["metadata"],
+        "name_extraction_time_seconds": crono.timings["names"],
+        "embedding_processing_time_seconds": round(
+            crono.timings["embeddings"] + crono.timings["index"], 3
+        ),
+        "total_processing_time_seconds": round(time.time() - total_start, 3),
+        "timings": crono.timings,
+        "msg": (
+            f"Document analyzed, censored and saved | {embedding_msg} | "
+            + _msg_metadata(gemini_success, metadata_info["local_fields"])
+        ),
+        "gemini_success": gemini_success,
+        "gemini_cache_hit": metadata_info["cache_hit"],
+        "gemini_error": gemini_error,
+        "metadata_context": metadata_info["context"],
+        "metadata_local_fields": metadata_info["local_fields"],
+    }
+
+
+def analizar_documento(file_path, user_id, on_stage=None, job_id=None, document_id=None):
+    """Versión síncrona (workers de jobs): todas las etapas en el proceso actual."""
+    return asyncio.run(
+        analizar_documento_async(
+            file_path,
+            user_id,
+            on_stage=on_stage,
+            usar_pools=False,
+            job_id=job_id,
+            document_id=document_id,
+        )
+    )
+
+
+def _buscar_pendiente(document_id):
+    """Ruta del PDF de un documento pendiente, o None si no existe."""
+    db = SessionLocal()
+    try:
+        fila = (
+            db.query(Document.file_path)
+            .filter(Document.id == document_id, Document.is_approved == False)
+            .first()
+        )
+        return fila.file_path if fila else None
+    finally:
+        db.close()
+
+
+def _actualizar_aprobado(document_id, approved_path, nombres_a_censurar, metadata, job_id=None):
+    """Lectura, cambios y commit (o rollback) en una sola sesión, dentro del mismo hilo."""
+    db = SessionLocal()
+    try:
+        document = (
+            db.query(Document)
+            .filter(Document.id == document_id, Document.is_approved == False)
+            .first()
+        )
+        if not document:
+            raise PipelineError("Documento pendiente no encontrado", status_code=404)
+        pending_path = document.file_path
+        document.file_path = approved_path
+        document.is_approved = True
+        document.detected_names = nombres_a_censurar
+        document.case_number = metadata.get("case_number")
+        document.case_year = metadata.get("case_year") or metadata.get("year") or ""
+        document.crime = metadata.get("crime")
+        document.verdict = metadata.get("verdict")
+        document.cited_jurisprudence = metadata.get("cited_jurisprudence") or []
+        if job_id:
+            assign_job_document(db, job_id, document_id)
+        db.commit()
+    except PipelineError:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise PipelineError(f"Error actualizando documento en la base de datos: {e}")
+    finally:
+        db.close()
+    # El pendiente se borra recién después del commit: un reintento anterior
+    # todavía lo necesita y uno posterior retoma desde el PDF aprobado
+    eliminar_archivo(pending_path)
+
+
+async def aprobar_documento_async(document_id, on_stage=None, usar_pools=True,
+                                  job_id=None, retomar=False):
+    """
+    Pipeline de /documents/approve: procesa un documento pendiente.
+    Mismo grafo que el análisis; save_document actualiza el registro pendiente.
+    Con `retomar=True` (el job ya aprobó el documento en un intento anterior)
+    solo falta indexar.
+    """
+    crono = Cronometro(on_stage)
+    ejecutor = EjecutorEtapas(usar_pools)
+    if retomar:
+        return await _retomar_indexado(document_id, crono, ejecutor)
+
+    file_path = await ejecutor.io(_buscar_pendiente, document_id)
+    if not file_path:
+        raise PipelineError("Documento pendiente no encontrado", status_code=404)
+    if not os.path.exists(file_path):
+        raise PipelineError("Archivo PDF no encontrado", status_code=404)
+    approved_path = _nueva_ruta_aprobada()
+
+    grafo = GrafoEtapas(crono)
+    # Procesar PDF y extraer info
+    grafo.etapa(
+        "parse_pdf",
+        lambda: _o_falla(
+            "Error extrayendo texto del PDF", ejecutor.parse(file_path)
+        ),
+    )
+    grafo.etapa(
+        "metadata", lambda pdf: ejecutor.io(_extraer_metadata, pdf.text), "parse_pdf"
+    )
+    # Extraer y filtrar nombres
+    grafo.etapa(
+        "names",
+        lambda pdf: _o_falla(
+            "Error extrayendo o filtrando nombres",
+            ejecutor.cpu("nlp", _detectar_nombres, pdf.text),
+        ),
+        "parse_pdf",
+    )
+    grafo.etapa(
+        "embeddings",
+        lambda pdf: ejecutor.cpu("embedding", _calcular_embeddings, pdf.text),
+        "parse_pdf",
+    )
+    # Censurar PDF y mover a carpeta de aprobados
+    grafo.etapa(
+        "censorship",
+        lambda pdf, nombres: _o_falla(
+            "Error censurando PDF",
+            ejecutor.cpu(
+                "nlp",
+                censurar_pdf_con_rectangulos,
+                file_path,
+                approved_path,
+                nombres[0],
+                documento=ejecutor.compartir(pdf),
+            ),
+        ),
+        "parse_pdf",
+        "names",
+    )
+    # Actualizar documento en la base de datos
+    grafo.etapa(
+        "save_document",
+        lambda meta, nombres, _: ejecutor.io(
+            _actualizar_aprobado, document_id, approved_path, nombres[0], meta[0], job_id
+        ),
+        "metadata",
+        "names",
+        "censorship",
+    )
+    grafo.etapa(
+        "index",
+        lambda meta, calculados, _: ejecutor.io(
+            _process_embeddings, document_id, calculados, meta[0]
+        ),
+        "metadata",
+        "embeddings",
+        "save_document",
+    )
+    resultados = await _ejecutar_o_limpiar(grafo, crono, approved_path)
+    invalidar_documento(document_id)
+
+    metadata, gemini_success, metadata_info, gemini_error = resultados["metadata"]
+    nombres_a_censurar, total_detectados = resultados["names"]
+    num_chunks, embedding_msg = resultados["index"]
+
+    return {
+        "metadata": metadata,
+        "document_id": document_id,
+        "file_url": f"/documents/download/{document_id}",
+        "detected_names": nombres_a_censurar,
+        "total_names_detected": total_detectados,
+        "total_names_censored": len(nombres_a_censurar),
+        "timings": crono.timings,
+        "msg": (
+            f"Documento aprobado, censurado y guardado | {embedding_msg} | "
+            + _msg_metadata(gemini_success, metadata_info["local_fields"])
+        ),
+        "gemini_success": gemini_success,
+        "gemini_cache_hit": metadata_info["cache_hit"],
+        "gemini_error": gemini_error,
+        "metadata_context": metadata_info["context"],
+        "metadata_local_fields": metadata_info["local_fields"],
+    }
+
+
+def aprobar_documento(document_id, on_stage=None, job_id=None, retomar=False):
+    """Versión síncrona (workers de jobs): todas las etapas en el proceso actual."""
+    return asyncio.run(
+        aprobar_documento_async(
+            document_id,
+            on_stage=on_stage,
+            usar_pools=False,
+            job_id=job_id,
+            retomar=retomar,
+        )
+    )
@@ -1,20 +1,18 @@
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
 from constants.prompts import RESUME_TECHNICAL_PROMPT
+from services.document.gemini_client import generate_text
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-def summarize_document(text, prompt=RESUME_TECHNICAL_PROMPT):
-    full_prompt = prompt + "\n" + text
+def summarize_document(text, prompt=RESUME_TECHNICAL_PROMPT, with_cache_info=False):
     try:
-        response = genai.GenerativeModel("models/gemini-2.5-flash-lite").generate_content(full_prompt)
-        resumen = response.text.strip()
+        response, cache_hit = generate_text(
+            prompt + "\n", text, cacheable=lambda r: bool(r.strip())
+        )
+        resumen = response.strip()
         # Limpieza opcional si Gemini devuelve markdown
         if resumen.startswith("```"):
             resumen = resumen.split("```")[1]
-        return resumen
     except Exception as e:
         print("Error al resumir con Gemini:", e)
-        return ""
\ No newline at end of file
+        resumen, cache_hit = "", False
+    if with_cache_info:
+        return resumen, cache_hit
+    return resumen
\ No newline at end of file
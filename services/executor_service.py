@@ -0,0 +1,100 @@
+"""
+Pools de procesos para las etapas CPU del pipeline (PDF, NER, censura, embeddings).
+
+Cada pool se arranca al iniciar la app y sus workers cargan los modelos en el
+initializer, así la primera petición no paga la carga. Los handlers async
+esperan el resultado con `await run_in_pool(...)` sin bloquear el event loop.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+PROCESS_POOLS_ENABLED = os.getenv("PROCESS_POOLS_ENABLED", "true").lower() == "true"
+POOL_SIZES = {
+    "nlp": int(os.getenv("NLP_POOL_SIZE", 1)),
+    "embedding": int(os.getenv("EMBEDDING_POOL_SIZE", 1)),
+}
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def _warm_nlp():
+    from services.pdf.spacy_service import get_nlp
+    from services.pdf.name_index import obtener_indice_nombres
+
+    get_nlp()
+    obtener_indice_nombres()
+
+
+def _warm_embedding():
+    from services.qdrant.embeddings_service import load_models
+
+    load_models()
+
+
+_INITIALIZERS = {
+    "nlp": _warm_nlp,
+    "embedding": _warm_embedding,
+}
+
+
+def _ping():
+    time.sleep(0.1)
+    return os.getpid()
+
+
+def get_pool(name):
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=POOL_SIZES[name],
+                # spawn: no heredar hilos ni conexiones del proceso de uvicorn
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_INITIALIZERS[name],
+            )
+            _pools[name] = pool
+        return pool
+
+
+def start_pool(name):
+    """Arranca los workers de un pool y espera a que carguen sus modelos."""
+    pool = get_pool(name)
+    for future in [pool.submit(_ping) for _ in range(POOL_SIZES[name])]:
+        future.result()
+
+
+def start_pools():
+    """Arranca todos los workers para que carguen sus modelos antes de la primera petición."""
+    if not PROCESS_POOLS_ENABLED:
+        return
+    for name in POOL_SIZES:
+        start_pool(name)
+
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
+
+
+async def run_in_pool(name, fn, *args, **kwargs):
+    """Ejecuta `fn` en el pool `name` (o en un hilo si los pools están desactivados)."""
+    call = partial(fn, *args, **kwargs)
+    if not PROCESS_POOLS_ENABLED:
+        return await asyncio.to_thread(call)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(name), call)
+
+
+def run_in_pool_sync(name, fn, *args, **kwargs):
+    """Versión bloqueante para endpoints sync (que ya corren en el threadpool)."""
+    if not PROCESS_POOLS_ENABLED:
+        return fn(*args, **kwargs)
+    return get_pool(name).submit(fn, *args, **kwargs).result()
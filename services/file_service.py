@@ -1,11 +1,27 @@
 import os
 import shutil
+import uuid
 
 UPLOAD_DIR = "uploaded_docs"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+def ruta_unica(directorio, prefijo=""):
+    """Ruta nueva para un PDF dentro de `directorio`, con nombre por uuid (nunca choca con otra)."""
+    os.makedirs(directorio, exist_ok=True)
+    return os.path.join(directorio, f"{prefijo}{uuid.uuid4().hex}.pdf")
+
 def save_uploaded_file(file):
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
+    # No se usa el nombre del cliente: el job corre más tarde y otra subida con
+    # el mismo nombre lo sobrescribiría
+    file_path = ruta_unica(UPLOAD_DIR)
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
-    return file_path
\ No newline at end of file
+    return file_path
+
+def eliminar_archivo(file_path):
+    """Borra un archivo temporal del pipeline; no falla si ya no existe."""
+    try:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+    except OSError as e:
+        print(f"Advertencia: No se pudo eliminar {file_path}: {e}")
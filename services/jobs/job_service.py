@@ -0,0 +1,152 @@
+import json
+import os
+from datetime import timedelta
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from models.job import Job
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_BACKOFF_SECONDS = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", 30))
+# Un job "running" sin latido durante este tiempo se considera huérfano
+# (worker caído o servidor reiniciado) y se vuelve a reclamar
+JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", 900))
+# Cada cuánto renueva el worker el lock del job mientras una etapa sigue corriendo
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", 60))
+
+
+def enqueue_job(db: Session, kind, payload, created_by=None):
+    job = Job(
+        kind=kind,
+        status="queued",
+        payload=json.dumps(payload, ensure_ascii=False),
+        timings=json.dumps({}),
+        max_attempts=JOB_MAX_ATTEMPTS,
+        created_by=created_by,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim_job(db: Session):
+    """Toma el siguiente job disponible (FOR UPDATE SKIP LOCKED) y lo marca como running."""
+    stale = func.now() - timedelta(seconds=JOB_LOCK_TIMEOUT_SECONDS)
+    job = (
+        db.query(Job)
+        .filter(
+            or_(
+                and_(Job.status == "queued", Job.run_after <= func.now()),
+                and_(Job.status == "running", Job.locked_at < stale),
+            )
+        )
+        .order_by(Job.created_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if not job:
+        db.rollback()
+        return None
+
+    job.attempts += 1
+    job.locked_at = func.now()
+    job.updated_at = func.now()
+    if job.attempts > job.max_attempts:
+        # Huérfano que ya agotó sus intentos
+        job.status = "failed"
+        job.error = job.error or "Job abandonado: se agotaron los reintentos"
+        db.commit()
+        return None
+    job.status = "running"
+    job.current_stage = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def update_job_progress(db: Session, job_id, stage, timings):
+    """Registra las etapas en curso (separadas por comas) y sirve de latido del worker."""
+    db.query(Job).filter(Job.id == job_id).update(
+        {
+            Job.current_stage: stage,
+            Job.timings: json.dumps(timings),
+            Job.locked_at: func.now(),
+            Job.updated_at: func.now(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def heartbeat_job(db: Session, job_id):
+    """Renueva el lock de un job en curso (etapas largas sin cambio de etapa)."""
+    db.query(Job).filter(Job.id == job_id, Job.status == "running").update(
+        {Job.locked_at: func.now()}, synchronize_session=False
+    )
+    db.commit()
+
+
+def assign_job_document(db: Session, job_id, document_id):
+    """
+    Anota en el job el documento que guardó. No hace commit: va en la misma
+    transacción que el documento, así un reintento nunca lo vuelve a insertar.
+    """
+    db.query(Job).filter(Job.id == job_id).update(
+        {Job.document_id: document_id}, synchronize_session=False
+    )
+
+
+def complete_job(db: Session, job_id, result, timings):
+    db.query(Job).filter(Job.id == job_id).update(
+        {
+            Job.status: "done",
+            Job.current_stage: None,
+            Job.result: json.dumps(result, ensure_ascii=False, default=str),
+            Job.timings: json.dumps(timings),
+            Job.error: None,
+            Job.updated_at: func.now(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def fail_job(db: Session, job_id, error, timings, retry=True):
+    """
+    Reencola con backoff exponencial o marca como failed si no quedan intentos.
+    Devuelve True si el job se volverá a intentar.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        return False
+    job.error = error
+    job.timings = json.dumps(timings)
+    job.updated_at = func.now()
+    if retry and job.attempts < job.max_attempts:
+        job.status = "queued"
+        job.run_after = func.now() + timedelta(
+            seconds=JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        )
+    else:
+        job.status = "failed"
+    db.commit()
+    return job.status == "queued"
+
+
+def job_to_dict(job):
+    return {
+        "id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "current_stage": job.current_stage,
+        # Las etapas independientes corren a la vez: current_stage las lista separadas por comas
+        "running_stages": job.current_stage.split(",") if job.current_stage else [],
+        "document_id": job.document_id,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "timings": json.loads(job.timings or "{}"),
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
@@ -0,0 +1,156 @@
+"""
+Pool de workers que procesa la cola de jobs persistida en Postgres.
+
+Uso:
+    python -m services.jobs.worker            # JOB_WORKERS procesos
+    python -m services.jobs.worker 4          # 4 procesos
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+from database.database import SessionLocal, engine
+from services.jobs.job_service import (
+    JOB_HEARTBEAT_SECONDS,
+    claim_job,
+    complete_job,
+    fail_job,
+    heartbeat_job,
+    update_job_progress,
+)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", 2))
+
+
+def _handlers():
+    from services.document.pipeline_service import analizar_documento, aprobar_documento
+    from services.pdf.name_index import obtener_indice_nombres
+    from services.pdf.spacy_service import get_nlp
+    from services.qdrant.embeddings_service import load_models
+
+    # Cada worker carga sus modelos antes de tomar el primer job
+    obtener_indice_nombres()
+    get_nlp()
+    load_models()
+
+    # Si el job ya guardó su documento en un intento anterior, solo se retoma
+    return {
+        "analyze": lambda job, p, on_stage: analizar_documento(
+            p["file_path"],
+            p["user_id"],
+            on_stage=on_stage,
+            job_id=job.id,
+            document_id=job.document_id,
+        ),
+        "approve": lambda job, p, on_stage: aprobar_documento(
+            p["document_id"],
+            on_stage=on_stage,
+            job_id=job.id,
+            retomar=job.document_id is not None,
+        ),
+    }
+
+
+def _latir(job_id, detener):
+    """Renueva el lock del job mientras corre, aunque una etapa dure más que el timeout."""
+    while not detener.wait(JOB_HEARTBEAT_SECONDS):
+        db = SessionLocal()
+        try:
+            heartbeat_job(db, job_id)
+        except Exception as e:
+            print(f"Advertencia: latido del job {job_id} fallido: {e}")
+        finally:
+            db.close()
+
+
+def _descartar_entrada(job):
+    """Un analyze que ya no se reintenta no necesita el PDF subido."""
+    from services.file_service import eliminar_archivo
+
+    if job.kind == "analyze":
+        eliminar_archivo(json.loads(job.payload or "{}").get("file_path"))
+
+
+def procesar_job(job, handlers):
+    from services.document.pipeline_service import PipelineError
+
+    timings = {}
+
+    def on_stage(etapas, parciales):
+        # Etapas concurrentes: se registran todas las que están corriendo
+        timings.clear()
+        timings.update(parciales)
+        db = SessionLocal()
+        try:
+            update_job_progress(db, job.id, ",".join(etapas) or None, parciales)
+        finally:
+            db.close()
+
+    detener_latido = threading.Event()
+    threading.Thread(target=_latir, args=(job.id, detener_latido), daemon=True).start()
+    db = SessionLocal()
+    try:
+        handler = handlers.get(job.kind)
+        if handler is None:
+            fail_job(db, job.id, f"Tipo de job desconocido: {job.kind}", timings, retry=False)
+            return
+        try:
+            result = handler(job, json.loads(job.payload or "{}"), on_stage)
+        except PipelineError as e:
+            # Errores 4xx (documento inexistente, etc.) no se reintentan
+            etapa = f"[{e.stage}] " if e.stage else ""
+            if not fail_job(db, job.id, etapa + e.msg, timings, retry=e.status_code >= 500):
+                _descartar_entrada(job)
+            return
+        except Exception as e:
+            traceback.print_exc()
+            if not fail_job(db, job.id, f"{type(e).__name__}: {e}", timings):
+                _descartar_entrada(job)
+            return
+        complete_job(db, job.id, result, result.get("timings", timings))
+    finally:
+        detener_latido.set()
+        db.close()
+
+
+def run_worker(worker_num=0):
+    # Conexiones propias: no reutilizar las heredadas del proceso padre
+    engine.dispose(close=False)
+    handlers = _handlers()
+    print(f"Worker {worker_num} (pid {os.getpid()}) esperando jobs")
+    while True:
+        db = SessionLocal()
+        try:
+            job = claim_job(db)
+        finally:
+            db.close()
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL_SECONDS)
+            continue
+        print(f"Worker {worker_num}: job {job.id} ({job.kind}), intento {job.attempts}")
+        procesar_job(job, handlers)
+
+
+def main(num_workers=JOB_WORKERS):
+    procesos = [
+        # No daemon: la censura de PDFs grandes puede lanzar sus propios procesos
+        multiprocessing.Process(target=run_worker, args=(i,))
+        for i in range(num_workers)
+    ]
+    for p in procesos:
+        p.start()
+    try:
+        for p in procesos:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procesos:
+            p.terminate()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else JOB_WORKERS)
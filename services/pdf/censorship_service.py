@@ -1,5 +1,16 @@
 import fitz  # PyMuPDF
+import multiprocessing
+import os
+import re
 import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Páginas mínimas por proceso al repartir la censura. Comparar una página cuesta
+# milisegundos y arrancar un proceso spawn (con sus imports) cuesta más que eso,
+# así que solo se reparte con al menos dos shards de este tamaño
+CENSURA_PAGINAS_POR_SHARD = int(os.getenv("CENSURA_PAGINAS_POR_SHARD", 2000))
+CENSURA_PROCESOS = int(os.getenv("CENSURA_PROCESOS", min(4, os.cpu_count() or 1)))
 
 def remover_tildes(texto):
     """Remueve tildes de un texto."""
@@ -8,26 +19,162 @@ def remover_tildes(texto):
         if unicodedata.category(c) != 'Mn'
     )
 
-def censurar_pdf_con_rectangulos(input_pdf_path, output_pdf_path, palabras_a_censurar):
+def normalizar_token(token):
+    """Token comparable: sin tildes, en mayúsculas y sin puntuación pegada."""
+    return re.sub(r"[^A-Z0-9]", "", remover_tildes(token).upper())
+
+
+# ============================================================================
+# AUTÓMATA AHO-CORASICK SOBRE SECUENCIAS DE TOKENS
+# ============================================================================
+
+class AutomataNombres:
+    """
+    Aho-Corasick cuyo alfabeto son tokens normalizados: encuentra todas las
+    apariciones de todos los nombres en una sola pasada sobre las palabras.
+    """
+
+    def __init__(self, nombres):
+        self._goto = [{}]
+        self._fail = [0]
+        self._salida = [[]]  # longitudes (en tokens) de los nombres que terminan aquí
+        for nombre in nombres:
+            tokens = [t for t in (normalizar_token(p) for p in nombre.split()) if t]
+            if tokens:
+                self._agregar(tokens)
+        self._construir_fallos()
+
+    def _agregar(self, tokens):
+        estado = 0
+        for token in tokens:
+            siguiente = self._goto[estado].get(token)
+            if siguiente is None:
+                siguiente = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._salida.append([])
+                self._goto[estado][token] = siguiente
+            estado = siguiente
+        if len(tokens) not in self._salida[estado]:
+            self._salida[estado].append(len(tokens))
+
+    def _construir_fallos(self):
+        cola = deque(self._goto[0].values())
+        while cola:
+            estado = cola.popleft()
+            for token, hijo in self._goto[estado].items():
+                cola.append(hijo)
+                if estado == 0:
+                    continue  # los hijos de la raíz fallan a la raíz
+                fallo = self._fail[estado]
+                while fallo and token not in self._goto[fallo]:
+                    fallo = self._fail[fallo]
+                self._fail[hijo] = self._goto[fallo].get(token, 0)
+                self._salida[hijo] = self._salida[hijo] + self._salida[self._fail[hijo]]
+
+    def buscar(self, tokens):
+        """Devuelve (inicio, fin) exclusivos de cada coincidencia en `tokens`."""
+        estado = 0
+        coincidencias = []
+        for i, token in enumerate(tokens):
+            while estado and token not in self._goto[estado]:
+                estado = self._fail[estado]
+            estado = self._goto[estado].get(token, 0)
+            for longitud in self._salida[estado]:
+                coincidencias.append((i + 1 - longitud, i + 1))
+        return coincidencias
+
+
+# ============================================================================
+# CÁLCULO DE RECTÁNGULOS
+# ============================================================================
+
+def _rectangulos_pagina(palabras, automata):
+    """Rectángulos a tapar en una página a partir de sus cajas de palabras."""
+    indices = []
+    tokens = []
+    for i, palabra in enumerate(palabras):
+        token = normalizar_token(palabra[4])
+        if token:
+            indices.append(i)
+            tokens.append(token)
+
+    marcadas = set()
+    for inicio, fin in automata.buscar(tokens):
+        marcadas.update(indices[inicio:fin])
+
+    # Une palabras marcadas consecutivas de la misma línea en un solo rectángulo
+    rectangulos = []
+    for i in sorted(marcadas):
+        x0, y0, x1, y1 = palabras[i][:4]
+        if rectangulos and i - 1 in marcadas:
+            rx0, ry0, rx1, ry1 = rectangulos[-1]
+            if abs(ry0 - y0) < 2 and abs(ry1 - y1) < 2:
+                rectangulos[-1] = (min(rx0, x0), min(ry0, y0), max(rx1, x1), max(ry1, y1))
+                continue
+        rectangulos.append((x0, y0, x1, y1))
+    return rectangulos
+
+def calcular_rectangulos(paginas_palabras, nombres):
+    """Rectángulos por página para una lista de páginas (lista de cajas de palabras)."""
+    automata = AutomataNombres(nombres)
+    return [_rectangulos_pagina(palabras, automata) for palabras in paginas_palabras]
+
+def _num_shards(num_paginas):
+    return min(CENSURA_PROCESOS, num_paginas // max(CENSURA_PAGINAS_POR_SHARD, 1))
+
+def _calcular_rectangulos_en_shards(paginas_palabras, nombres):
+    # Rangos del mismo tamaño, uno por proceso
+    num_shards = _num_shards(len(paginas_palabras))
+    tamano = -(-len(paginas_palabras) // num_shards)
+    rangos = [
+        paginas_palabras[i:i + tamano]
+        for i in range(0, len(paginas_palabras), tamano)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=len(rangos),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        resultados = executor.map(calcular_rectangulos, rangos, [nombres] * len(rangos))
+        return [rects for shard in resultados for rects in shard]
+
+
+# ============================================================================
+# CENSURA
+# ============================================================================
+
+def censurar_pdf_con_rectangulos(input_pdf_path, output_pdf_path, palabras_a_censurar, documento=None):
     """
     Censura visualmente todas las palabras de la lista en el PDF, cubriéndolas con un rectángulo negro.
-    Busca variantes con/sin tildes y mayúsculas/minúsculas.
+    Las cajas de palabras de cada página se recorren una sola vez y se comparan contra
+    todos los nombres a la vez (sin importar tildes ni mayúsculas). Si se pasa el
+    ParsedPDF ya parseado se reutilizan sus cajas de palabras.
     """
     doc = fitz.open(input_pdf_path)
-    for page in doc:
-        for palabra in palabras_a_censurar:
-            # Genera variantes de búsqueda
-            variantes = set()
-            variantes.add(palabra)  # Original
-            variantes.add(palabra.lower())  # Minúsculas
-            variantes.add(palabra.upper())  # Mayúsculas
-            variantes.add(remover_tildes(palabra))  # Sin tildes
-            variantes.add(remover_tildes(palabra).lower())  # Sin tildes, minúsculas
-            variantes.add(remover_tildes(palabra).upper())  # Sin tildes, mayúsculas
-            
-            for variante in variantes:
-                areas = page.search_for(variante, quads=True)
-                for area in areas:
-                    page.draw_rect(area.rect, color=(0, 0, 0), fill=(0, 0, 0))
-    
-    doc.save(output_pdf_path)
\ No newline at end of file
+    try:
+        if palabras_a_censurar:
+            if documento is not None:
+                paginas_palabras = [p.words for p in documento.pages]
+            else:
+                paginas_palabras = [
+                    [tuple(w[:5]) for w in page.get_text("words")] for page in doc
+                ]
+
+            if _num_shards(len(paginas_palabras)) > 1:
+                rectangulos = _calcular_rectangulos_en_shards(paginas_palabras, palabras_a_censurar)
+            else:
+                rectangulos = calcular_rectangulos(paginas_palabras, palabras_a_censurar)
+
+            for page, rects in zip(doc, rectangulos):
+                if not rects:
+                    continue
+                # Un solo lote de rectángulos por página
+                shape = page.new_shape()
+                for rect in rects:
+                    shape.draw_rect(fitz.Rect(rect))
+                shape.finish(color=(0, 0, 0), fill=(0, 0, 0))
+                shape.commit()
+
+        doc.save(output_pdf_path)
+    finally:
+        doc.close()
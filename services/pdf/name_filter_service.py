@@ -1,6 +1,4 @@
 import re
-import pandas as pd
-from pybloom_live import BloomFilter
 from constants.constants import BLACKLIST
 
 
@@ -33,34 +31,6 @@ def limpiar_nombre_blacklist(nombre_normalizado):
     return " ".join(palabras_filtradas).strip()
 
 
-# ============================================================================
-# FUNCIONES DE CARGA DE DATOS
-# ============================================================================
-
-def cargar_dataset_nombres(ruta_csv):
-    """Carga dataset CSV y crea Bloom Filter + índice por palabra."""
-    df = pd.read_csv(ruta_csv)
-    nombres_normalizados = set(normalizar_nombre(n) for n in df["name"].dropna().unique())
-    
-    bloom_filter = BloomFilter(capacity=len(nombres_normalizados), error_rate=0.001)
-    for nombre in nombres_normalizados:
-        bloom_filter.add(nombre)
-    
-    nombres_por_palabra = {}
-    for nombre in nombres_normalizados:
-        for palabra in nombre.split():
-            if palabra not in nombres_por_palabra:
-                nombres_por_palabra[palabra] = []
-            nombres_por_palabra[palabra].append(nombre)
-    
-    return {
-        "bloom_filter": bloom_filter,
-        "nombres_set": nombres_normalizados,
-        "nombres_por_palabra": nombres_por_palabra,
-        "dataframe": df,
-    }
-
-
 # ============================================================================
 # FUNCIONES DE VALIDACIÓN
 # ============================================================================
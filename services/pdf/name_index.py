@@ -0,0 +1,294 @@
+"""
+Índice compilado del lexicón de nombres/apellidos.
+
+El CSV ``data/name_surnames_normalizated.csv`` se compila una sola vez a un
+archivo binario (``.idx``) con:
+
+- tabla ordenada de nombres normalizados (offsets uint32 + blob UTF-8)
+- tabla ordenada de palabras + postings (índice palabra -> nombres)
+- Bloom Filter serializado (bits crudos)
+
+En tiempo de ejecución el archivo se abre con ``mmap`` (solo lectura) y se
+consulta sin copiar nada a memoria de Python, así que los workers forkeados
+de un mismo padre (o que mapean el mismo archivo) comparten las páginas.
+
+Construcción manual:
+    python -m services.pdf.name_index
+"""
+
+import csv
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+
+# name_filter_service solo depende de re y constants: importarlo no carga nada pesado
+from services.pdf.name_filter_service import normalizar_nombre
+
+RUTA_CSV_NOMBRES = os.getenv("NAMES_CSV_PATH", "data/name_surnames_normalizated.csv")
+RUTA_INDICE_NOMBRES = os.getenv("NAMES_INDEX_PATH", "data/name_surnames_normalizated.idx")
+
+MAGIC = b"NAMEIDX1"
+# magic, n_nombres, n_palabras, bloom_bits, bloom_hashes, n_postings
+_HEADER = struct.Struct("<8sIIQII")
+# offsets de las secciones (en bytes, desde el inicio del archivo)
+_SECCIONES = (
+    "nombres_offsets",
+    "nombres_blob",
+    "palabras_offsets",
+    "palabras_blob",
+    "postings_ptr",
+    "postings",
+    "bloom",
+)
+_TABLA_SECCIONES = struct.Struct("<" + "Q" * len(_SECCIONES))
+
+
+# ============================================================================
+# BLOOM FILTER
+# ============================================================================
+
+def _posiciones_bloom(clave, num_bits, num_hashes):
+    """Doble hashing (Kirsch-Mitzenmacher) sobre un blake2b de 128 bits."""
+    digest = hashlib.blake2b(clave.encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+
+def _dimensionar_bloom(capacidad, error_rate):
+    capacidad = max(capacidad, 1)
+    num_bits = math.ceil(-capacidad * math.log(error_rate) / (math.log(2) ** 2))
+    num_hashes = max(1, round(num_bits / capacidad * math.log(2)))
+    return num_bits, num_hashes
+
+
+class MmapBloomFilter:
+    """Bloom Filter de solo lectura respaldado por un buffer mapeado."""
+
+    def __init__(self, bits, num_bits, num_hashes):
+        self._bits = bits
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+
+    def __contains__(self, clave):
+        for pos in _posiciones_bloom(clave, self.num_bits, self.num_hashes):
+            if not self._bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+# ============================================================================
+# TABLAS ORDENADAS
+# ============================================================================
+
+class TablaCadenas:
+    """Tabla ordenada de cadenas (offsets + blob) con búsqueda binaria."""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __contains__(self, clave):
+        return self.buscar(clave) >= 0
+
+    def buscar(self, clave):
+        """Devuelve la posición de ``clave`` o -1 si no está."""
+        objetivo = clave.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            actual = bytes(self._blob[self._offsets[mid]:self._offsets[mid + 1]])
+            if actual < objetivo:
+                lo = mid + 1
+            elif actual > objetivo:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+
+class IndicePalabras:
+    """Índice palabra -> nombres con la misma interfaz que el dict original."""
+
+    def __init__(self, palabras, postings_ptr, postings, nombres):
+        self._palabras = palabras
+        self._ptr = postings_ptr
+        self._postings = postings
+        self._nombres = nombres
+
+    def __len__(self):
+        return len(self._palabras)
+
+    def __contains__(self, palabra):
+        return self._palabras.buscar(palabra) >= 0
+
+    def __getitem__(self, palabra):
+        i = self._palabras.buscar(palabra)
+        if i < 0:
+            raise KeyError(palabra)
+        return [self._nombres[j] for j in self._postings[self._ptr[i]:self._ptr[i + 1]]]
+
+    def get(self, palabra, default=None):
+        try:
+            return self[palabra]
+        except KeyError:
+            return default
+
+
+# ============================================================================
+# CONSTRUCCIÓN
+# ============================================================================
+
+def _tabla(cadenas):
+    offsets = array("I", [0])
+    blob = bytearray()
+    for cadena in cadenas:
+        blob += cadena.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets.tobytes(), bytes(blob)
+
+
+def construir_indice_nombres(ruta_csv=RUTA_CSV_NOMBRES, ruta_indice=RUTA_INDICE_NOMBRES, error_rate=0.001):
+    """Compila el CSV de nombres al archivo binario mapeable."""
+    with open(ruta_csv, newline="", encoding="utf-8") as f:
+        crudos = {fila["name"] for fila in csv.DictReader(f) if fila.get("name")}
+    nombres = sorted({n for n in (normalizar_nombre(c) for c in crudos) if n})
+
+    palabras_a_nombres = {}
+    for i, nombre in enumerate(nombres):
+        for palabra in nombre.split():
+            palabras_a_nombres.setdefault(palabra, []).append(i)
+    palabras = sorted(palabras_a_nombres)
+
+    postings_ptr = array("I", [0])
+    postings = array("I")
+    for palabra in palabras:
+        postings.extend(palabras_a_nombres[palabra])
+        postings_ptr.append(len(postings))
+
+    num_bits, num_hashes = _dimensionar_bloom(len(nombres), error_rate)
+    bloom = bytearray((num_bits + 7) // 8)
+    for nombre in nombres:
+        for pos in _posiciones_bloom(nombre, num_bits, num_hashes):
+            bloom[pos >> 3] |= 1 << (pos & 7)
+
+    nombres_offsets, nombres_blob = _tabla(nombres)
+    palabras_offsets, palabras_blob = _tabla(palabras)
+    datos = [
+        nombres_offsets,
+        nombres_blob,
+        palabras_offsets,
+        palabras_blob,
+        postings_ptr.tobytes(),
+        postings.tobytes(),
+        bytes(bloom),
+    ]
+
+    # Secciones alineadas a 8 bytes para poder hacer cast() sobre el mmap
+    posicion = _HEADER.size + _TABLA_SECCIONES.size
+    offsets_secciones = []
+    for seccion in datos:
+        posicion += -posicion % 8
+        offsets_secciones.append(posicion)
+        posicion += len(seccion)
+
+    tmp = f"{ruta_indice}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(nombres), len(palabras), num_bits, num_hashes, len(postings)))
+        f.write(_TABLA_SECCIONES.pack(*offsets_secciones))
+        for inicio, seccion in zip(offsets_secciones, datos):
+            f.write(b"\0" * (inicio - f.tell()))
+            f.write(seccion)
+    # Reemplazo atómico: otros procesos nunca ven un índice a medio escribir
+    os.replace(tmp, ruta_indice)
+    return ruta_indice
+
+
+# ============================================================================
+# CARGA (MMAP)
+# ============================================================================
+
+class IndiceNombres:
+    """Lexicón mapeado en memoria. Se usa como ``dataset_info`` en filtrar_nombres."""
+
+    def __init__(self, ruta_indice):
+        with open(ruta_indice, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, n_nombres, n_palabras, num_bits, num_hashes, n_postings = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Índice de nombres inválido: {ruta_indice}")
+        offs = dict(zip(_SECCIONES, _TABLA_SECCIONES.unpack_from(buf, _HEADER.size)))
+
+        def uint32(seccion, cantidad):
+            inicio = offs[seccion]
+            return buf[inicio:inicio + 4 * cantidad].cast("I")
+
+        nombres_offsets = uint32("nombres_offsets", n_nombres + 1)
+        palabras_offsets = uint32("palabras_offsets", n_palabras + 1)
+        self.nombres = TablaCadenas(
+            nombres_offsets,
+            buf[offs["nombres_blob"]:offs["nombres_blob"] + nombres_offsets[-1]],
+        )
+        palabras = TablaCadenas(
+            palabras_offsets,
+            buf[offs["palabras_blob"]:offs["palabras_blob"] + palabras_offsets[-1]],
+        )
+        self.nombres_por_palabra = IndicePalabras(
+            palabras,
+            uint32("postings_ptr", n_palabras + 1),
+            uint32("postings", n_postings),
+            self.nombres,
+        )
+        self.bloom_filter = MmapBloomFilter(
+            buf[offs["bloom"]:offs["bloom"] + (num_bits + 7) // 8], num_bits, num_hashes
+        )
+
+    def __getitem__(self, clave):
+        # Acceso por clave, como el dict `dataset_info` que recibe filtrar_nombres
+        return {
+            "bloom_filter": self.bloom_filter,
+            "nombres_set": self.nombres,
+            "nombres_por_palabra": self.nombres_por_palabra,
+        }[clave]
+
+
+_indice = None
+_lock = threading.Lock()
+
+
+def _indice_desactualizado(ruta_csv, ruta_indice):
+    if not os.path.exists(ruta_indice):
+        return True
+    return os.path.exists(ruta_csv) and os.path.getmtime(ruta_csv) > os.path.getmtime(ruta_indice)
+
+
+def obtener_indice_nombres(ruta_csv=RUTA_CSV_NOMBRES, ruta_indice=RUTA_INDICE_NOMBRES):
+    """Devuelve el índice del proceso, compilándolo si falta o está desactualizado."""
+    global _indice
+    if _indice is None:
+        with _lock:
+            if _indice is None:
+                if _indice_desactualizado(ruta_csv, ruta_indice):
+                    construir_indice_nombres(ruta_csv, ruta_indice)
+                _indice = IndiceNombres(ruta_indice)
+    return _indice
+
+
+if __name__ == "__main__":
+    ruta = construir_indice_nombres()
+    print(f"Índice de nombres generado: {ruta} ({os.path.getsize(ruta)} bytes)")
@@ -1,16 +1,68 @@
-import pdfplumber
+import fitz  # PyMuPDF
 import re
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ParsedPage:
+    number: int
+    text: str
+    # (x0, y0, x1, y1, palabra) en coordenadas de PyMuPDF
+    words: list = field(default_factory=list)
+
+
+@dataclass
+class ParsedPDF:
+    """PDF parseado una sola vez y compartido por todas las etapas del pipeline."""
+
+    path: str
+    pages: list
+    text: str  # texto completo con espacios normalizados
+
+    @property
+    def text_lower(self):
+        return self.text.lower()
+
+
+def _normalize_whitespace(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def parse_pdf(file, with_words=True):
+    """
+    Abre el PDF una vez y extrae texto y cajas de palabras por página.
+    Con `with_words=False` solo el texto (más liviano de enviar entre procesos).
+    """
+    if isinstance(file, str):
+        doc = fitz.open(file)
+        path = file
+    else:
+        doc = fitz.open(stream=file.read(), filetype="pdf")
+        path = getattr(file, "name", "")
+    try:
+        pages = [
+            ParsedPage(
+                number=page.number,
+                text=page.get_text("text") or "",
+                words=[tuple(w[:5]) for w in page.get_text("words")] if with_words else [],
+            )
+            for page in doc
+        ]
+    finally:
+        doc.close()
+    text = _normalize_whitespace(" ".join(p.text for p in pages))
+    return ParsedPDF(path=path, pages=pages, text=text)
+
 
 def extract_text_from_pdf(file, to_lower=False):
-    text = ""
-    with pdfplumber.open(file) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-    # Limpia saltos de línea y espacios extra
-    text = re.sub(r'\s+', ' ', text).strip()
+    if isinstance(file, ParsedPDF):
+        parsed = file
+    else:
+        # Solo se pide el texto: sin cajas de palabras
+        parsed = parse_pdf(file, with_words=False)
     if to_lower:
-        return text.lower()
-    return text
+        return parsed.text_lower
+    return parsed.text
 
 def split_text_by_words(text, chunk_size=1000):
     """Divide el texto en chunks sin cortar palabras"""
@@ -32,4 +84,4 @@ def split_text_by_words(text, chunk_size=1000):
     if current_chunk:
         chunks.append(' '.join(current_chunk))
     
-    return chunks
\ No newline at end of file
+    return chunks
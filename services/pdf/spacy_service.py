@@ -1,32 +1,73 @@
-import spacy
-from services.pdf.pdf_service import extract_text_from_pdf, split_text_by_words
+import os
+import threading
+from services.pdf.pdf_service import ParsedPDF, parse_pdf, split_text_by_words
 
-nlp = spacy.load("es_core_news_lg")
+SPACY_MODEL = os.getenv("SPACY_MODEL", "es_core_news_lg")
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", 64))
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", 1))
 
-def extraer_personas_del_pdf(pdf_path, to_lower=True):
+_nlp = None
+_lock = threading.Lock()
+
+def _cargar_nlp():
+    """Carga el modelo dejando activos solo los componentes que necesita el NER."""
+    import spacy
+
+    modelo = spacy.load(SPACY_MODEL)
+    activos = {"ner"}
+    # Si el NER escucha al tok2vec compartido, hay que mantenerlo
+    if "tok2vec" in modelo.pipe_names and "ner" in getattr(
+        modelo.get_pipe("tok2vec"), "listening_components", []
+    ):
+        activos.add("tok2vec")
+    modelo.select_pipes(enable=[p for p in modelo.pipe_names if p in activos])
+    return modelo
+
+def get_nlp():
+    """Modelo de spaCy del proceso; se carga en el primer uso."""
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                _nlp = _cargar_nlp()
+    return _nlp
+
+def extraer_personas_del_texto(texto, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS):
     """
-    Extrae personas del PDF usando Spacy NER.
+    Extrae personas de un texto usando Spacy NER.
+    Los chunks se procesan en streaming con nlp.pipe; `n_process` > 1 reparte
+    los lotes entre varios procesos para documentos grandes.
     """
-    texto = extract_text_from_pdf(pdf_path, to_lower=to_lower)
     chunks = split_text_by_words(texto, chunk_size=1000)
     
     personas = []
-    for chunk in chunks:
-        documento = nlp(chunk)
+    for documento in get_nlp().pipe(chunks, batch_size=batch_size, n_process=n_process):
         for ent in documento.ents:
             if ent.label_ == "PER":
                 personas.append(ent.text)
     
     return personas
 
-def extraer_personas_ambos_casos(pdf_path):
+def extraer_personas_del_pdf(documento, to_lower=True, **kwargs):
+    """
+    Extrae personas del PDF (ruta o ParsedPDF) usando Spacy NER.
+    """
+    if not isinstance(documento, ParsedPDF):
+        documento = parse_pdf(documento)
+    texto = documento.text_lower if to_lower else documento.text
+    return extraer_personas_del_texto(texto, **kwargs)
+
+def extraer_personas_ambos_casos(documento, **kwargs):
     """
     Extrae personas en minúsculas y en caso normal, devuelve ambas listas únicas.
+    Acepta una ruta o un ParsedPDF ya parseado (el PDF se parsea una sola vez).
     """
-    personas_minusculas = extraer_personas_del_pdf(pdf_path, to_lower=True)
-    personas_normal = extraer_personas_del_pdf(pdf_path, to_lower=False)
+    if not isinstance(documento, ParsedPDF):
+        documento = parse_pdf(documento)
+    personas_minusculas = extraer_personas_del_pdf(documento, to_lower=True, **kwargs)
+    personas_normal = extraer_personas_del_pdf(documento, to_lower=False, **kwargs)
     
     personas_minusculas_unicos = sorted(set(personas_minusculas))
     personas_normal_unicos = sorted(set(personas_normal))
     
-    return personas_minusculas_unicos, personas_normal_unicos
\ No newline at end of file
+    return personas_minusculas_unicos, personas_normal_unicos
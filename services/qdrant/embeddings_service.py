@@ -1,13 +1,139 @@
-from transformers import AutoTokenizer, AutoModel
-import torch
+import os
+import threading
 
-# Carga el modelo y el tokenizer solo una vez
-tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
-model = AutoModel.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# torch (por defecto) u onnx (export int8, ver services/qdrant/onnx_export.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "data/onnx/all-MiniLM-L6-v2.int8.onnx")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+# Ventana de MiniLM (256) menos [CLS] y [SEP]
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 254))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 32))
+
+# El tokenizer y el modelo se cargan una sola vez, en el primer uso
+# (importar este módulo no carga transformers/torch)
+_tokenizer = None
+_model = None
+_lock = threading.Lock()
+
+def get_tokenizer():
+    global _tokenizer
+    if _tokenizer is None:
+        with _lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+
+                _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return _tokenizer
+
+def get_model():
+    """Modelo del backend configurado: AutoModel (torch) o InferenceSession (onnx)."""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                if EMBEDDING_BACKEND == "onnx":
+                    import onnxruntime as ort
+
+                    _model = ort.InferenceSession(ONNX_MODEL_PATH, providers=["CPUExecutionProvider"])
+                else:
+                    from transformers import AutoModel
+
+                    model = AutoModel.from_pretrained(MODEL_NAME)
+                    model.eval()
+                    _model = model
+    return _model
+
+def load_models():
+    get_tokenizer()
+    get_model()
+
+def _inicio_de_palabra(word_ids, pos, minimo):
+    """Mayor posición en (minimo, pos] donde empieza una palabra, o None si no hay ninguna."""
+    while pos > minimo:
+        if word_ids[pos] != word_ids[pos - 1]:
+            return pos
+        pos -= 1
+    return None
+
+def chunk_text_by_tokens(text, max_tokens=CHUNK_MAX_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    """
+    Divide el texto en chunks que caben exactamente en la ventana del modelo,
+    usando los offsets del tokenizer. Los cortes caen en límites de palabra y
+    chunks consecutivos comparten `overlap` tokens. Una sola palabra más larga
+    que la ventana (ruido de OCR, identificadores) se corta en `max_tokens`.
+    """
+    encoding = get_tokenizer()(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+    offsets = encoding["offset_mapping"]
+    word_ids = encoding.word_ids()
+    total = len(offsets)
+    chunks = []
+    start = 0
+    while start < total:
+        end = min(start + max_tokens, total)
+        # No cortar una palabra a la mitad (sub-tokens "##"), salvo que la ventana no tenga otro límite
+        if end < total:
+            end = _inicio_de_palabra(word_ids, end, start) or end
+        chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+        if end >= total:
+            break
+        next_start = max(end - overlap, start + 1)
+        # El siguiente chunk también empieza al inicio de una palabra (si la hay en el solapamiento)
+        start = _inicio_de_palabra(word_ids, next_start, start) or next_start
+    return chunks
+
+def _mean_pooling(last_hidden_state, attention_mask):
+    # Promedia solo los tokens reales: el padding no desvía el vector
+    mask = attention_mask.unsqueeze(-1).to(last_hidden_state.dtype)
+    summed = (last_hidden_state * mask).sum(dim=1)
+    counts = mask.sum(dim=1).clamp(min=1e-9)
+    return summed / counts
+
+def _forward_torch(batch):
+    import torch
+
+    inputs = get_tokenizer().pad(batch, return_tensors="pt")
+    with torch.inference_mode():
+        outputs = get_model()(**inputs)
+        return _mean_pooling(outputs.last_hidden_state, inputs["attention_mask"]).tolist()
+
+def _forward_onnx(batch):
+    import numpy as np
+
+    session = get_model()
+    inputs = get_tokenizer().pad(batch, return_tensors="np")
+    feeds = {
+        i.name: inputs[i.name].astype(np.int64)
+        for i in session.get_inputs()
+        if i.name in inputs
+    }
+    last_hidden_state = session.run(None, feeds)[0]
+    mask = inputs["attention_mask"][..., None].astype(last_hidden_state.dtype)
+    pooled = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    return pooled.tolist()
+
+def _forward(batch):
+    if EMBEDDING_BACKEND == "onnx":
+        return _forward_onnx(batch)
+    return _forward_torch(batch)
+
+def get_embeddings(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Genera embeddings para una lista de textos en lotes de `batch_size`.
+    Los textos se tokenizan una vez y se agrupan por longitud para minimizar
+    el padding; el resultado conserva el orden de entrada.
+    """
+    if not texts:
+        return []
+    encoded = get_tokenizer()(list(texts), truncation=True)
+    order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+    embeddings = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        batch = {key: [encoded[key][i] for i in indices] for key in encoded.keys()}
+        for i, vector in zip(indices, _forward(batch)):
+            embeddings[i] = vector
+    return embeddings
 
 def get_embedding(text):
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        emb = outputs.last_hidden_state.mean(dim=1).squeeze().tolist()
-    return emb
\ No newline at end of file
+    return get_embeddings([text])[0]
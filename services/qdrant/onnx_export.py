@@ -0,0 +1,103 @@
+"""
+Exporta MiniLM a ONNX, lo cuantiza a int8 (dinámico) y verifica la paridad
+con la salida de PyTorch (coseno >= PARITY_MIN_COSINE en todas las frases).
+
+Uso:
+    python -m services.qdrant.onnx_export            # export + cuantización + paridad
+    python -m services.qdrant.onnx_export --check    # solo la verificación de paridad
+
+Después, activar con EMBEDDING_BACKEND=onnx (ruta en ONNX_MODEL_PATH).
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+import onnxruntime as ort
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import AutoModel, AutoTokenizer
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "data/onnx/all-MiniLM-L6-v2.int8.onnx")
+PARITY_MIN_COSINE = 0.99
+
+FRASES_PARIDAD = [
+    "violencia familiar",
+    "conducción en estado de ebriedad",
+    "Casación N.° 123-2019/Lima sobre prescripción de la acción penal",
+    "EXPEDIENTE N° 11468-2018-44-0401-JR-PE-01",
+    "El Tribunal declara infundado el recurso de apelación interpuesto por la defensa "
+    "del sentenciado y confirma la sentencia condenatoria en todos sus extremos.",
+    "Se absuelve al acusado del delito de lesiones leves por insuficiencia probatoria, "
+    "conforme al principio de presunción de inocencia.",
+]
+
+
+def exportar(tokenizer, model, ruta_fp32):
+    muestra = tokenizer(["texto de ejemplo"], return_tensors="pt")
+    torch.onnx.export(
+        model,
+        (muestra["input_ids"], muestra["attention_mask"], muestra["token_type_ids"]),
+        ruta_fp32,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "token_type_ids": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"},
+        },
+        opset_version=14,
+    )
+
+
+def _pooling(last_hidden_state, attention_mask):
+    mask = attention_mask[..., None].astype(np.float32)
+    return (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def verificar_paridad(tokenizer, model, ruta_onnx):
+    inputs = tokenizer(FRASES_PARIDAD, padding=True, truncation=True, return_tensors="pt")
+    with torch.inference_mode():
+        referencia = _pooling(
+            model(**inputs).last_hidden_state.numpy(), inputs["attention_mask"].numpy()
+        )
+
+    session = ort.InferenceSession(ruta_onnx, providers=["CPUExecutionProvider"])
+    feeds = {i.name: inputs[i.name].numpy().astype(np.int64) for i in session.get_inputs()}
+    candidato = _pooling(session.run(None, feeds)[0], inputs["attention_mask"].numpy())
+
+    cosenos = (referencia * candidato).sum(axis=1) / (
+        np.linalg.norm(referencia, axis=1) * np.linalg.norm(candidato, axis=1)
+    )
+    for frase, coseno in zip(FRASES_PARIDAD, cosenos):
+        print(f"  {coseno:.5f}  {frase[:60]}")
+    return float(cosenos.min())
+
+
+def main(solo_verificar=False):
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME)
+    model.eval()
+
+    if not solo_verificar:
+        directorio = os.path.dirname(ONNX_MODEL_PATH) or "."
+        os.makedirs(directorio, exist_ok=True)
+        # El fp32 intermedio va a un directorio temporal: nunca coincide con la salida
+        # int8, sea cual sea el nombre de ONNX_MODEL_PATH
+        with tempfile.TemporaryDirectory(dir=directorio) as temporal:
+            ruta_fp32 = os.path.join(temporal, "model.fp32.onnx")
+            exportar(tokenizer, model, ruta_fp32)
+            quantize_dynamic(ruta_fp32, ONNX_MODEL_PATH, weight_type=QuantType.QInt8)
+        print(f"Modelo int8 exportado: {ONNX_MODEL_PATH}")
+
+    minimo = verificar_paridad(tokenizer, model, ONNX_MODEL_PATH)
+    if minimo < PARITY_MIN_COSINE:
+        print(f"✗ Paridad insuficiente: coseno mínimo {minimo:.5f} < {PARITY_MIN_COSINE}")
+        sys.exit(1)
+    print(f"✓ Paridad OK: coseno mínimo {minimo:.5f}")
+
+
+if __name__ == "__main__":
+    main(solo_verificar="--check" in sys.argv)
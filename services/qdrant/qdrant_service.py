@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qdrant_models
@@ -12,28 +13,132 @@ qdrant = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
 collection_name = "judicial_chunks"
 VECTOR_SIZE = 384
 
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", 128))
+QDRANT_UPSERT_PARALLEL = int(os.getenv("QDRANT_UPSERT_PARALLEL", 1))
+QDRANT_UPSERT_WAIT = os.getenv("QDRANT_UPSERT_WAIT", "true").lower() == "true"
+
+# Metadata del documento desnormalizada en cada chunk, con índice de payload
+# para que Qdrant filtre durante el recorrido HNSW
+PAYLOAD_INDEXES = {
+    "document_id": qdrant_models.PayloadSchemaType.INTEGER,
+    "case_year": qdrant_models.PayloadSchemaType.KEYWORD,
+    "crime": qdrant_models.PayloadSchemaType.KEYWORD,
+    "verdict": qdrant_models.PayloadSchemaType.KEYWORD,
+    "is_approved": qdrant_models.PayloadSchemaType.BOOL,
+}
+
+# Una sola verificación de la colección por proceso
+_collection_ready = False
+
 def ensure_collection():
+    global _collection_ready
+    if _collection_ready:
+        return
     if collection_name not in [c.name for c in qdrant.get_collections().collections]:
         qdrant.create_collection(
             collection_name=collection_name,
             vectors_config=qdrant_models.VectorParams(size=VECTOR_SIZE, distance="Cosine")
         )
+    ensure_payload_indexes()
+    _collection_ready = True
 
-def upsert_embedding(doc_id, emb, payload):
-    qdrant.upsert(
-        collection_name=collection_name,
-        points=[
-            qdrant_models.PointStruct(
-                id=doc_id,
-                vector=emb,
-                payload=payload 
+def ensure_payload_indexes(client=None):
+    client = client or qdrant
+    existentes = client.get_collection(collection_name).payload_schema or {}
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name not in existentes:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=schema,
             )
-        ]
+
+def normalize_filter_value(value):
+    """Los filtros son de coincidencia exacta: se guardan y consultan en minúsculas."""
+    return str(value or "").strip().lower()
+
+def document_payload(metadata, is_approved=True):
+    """Campos filtrables del documento que se copian en el payload de cada chunk."""
+    return {
+        "case_year": normalize_filter_value(metadata.get("case_year")),
+        "crime": normalize_filter_value(metadata.get("crime")),
+        "verdict": normalize_filter_value(metadata.get("verdict")),
+        "is_approved": bool(is_approved),
+    }
+
+def update_document_payload(document_id, metadata, is_approved=True):
+    """Actualiza la metadata desnormalizada en todos los chunks de un documento."""
+    qdrant.set_payload(
+        collection_name=collection_name,
+        payload=document_payload(metadata, is_approved),
+        points=qdrant_models.Filter(
+            must=[
+                qdrant_models.FieldCondition(
+                    key="document_id",
+                    match=qdrant_models.MatchValue(value=int(document_id)),
+                )
+            ]
+        ),
     )
 
-def search_embeddings(query_emb, top_k=3):
+def build_filter(filters):
+    """Filter de Qdrant a partir de {campo: valor}; ignora valores vacíos."""
+    conditions = []
+    for key, value in (filters or {}).items():
+        if value is None or value == "":
+            continue
+        if not isinstance(value, bool):
+            value = normalize_filter_value(value)
+        conditions.append(
+            qdrant_models.FieldCondition(key=key, match=qdrant_models.MatchValue(value=value))
+        )
+    return qdrant_models.Filter(must=conditions) if conditions else None
+
+def upsert_embeddings(points, batch_size=QDRANT_UPSERT_BATCH_SIZE, wait=QDRANT_UPSERT_WAIT, parallel=QDRANT_UPSERT_PARALLEL):
+    """
+    Inserta puntos (id, vector, payload) en lotes de `batch_size`.
+    Con `parallel` > 1 se mantienen varios lotes en vuelo a la vez; con
+    `wait=False` Qdrant responde sin esperar a que el lote se indexe.
+    """
+    structs = [
+        qdrant_models.PointStruct(id=point_id, vector=emb, payload=payload)
+        for point_id, emb, payload in points
+    ]
+    batches = [structs[i:i + batch_size] for i in range(0, len(structs), batch_size)]
+
+    def _upsert(batch):
+        qdrant.upsert(collection_name=collection_name, points=batch, wait=wait)
+
+    if parallel <= 1 or len(batches) <= 1:
+        for batch in batches:
+            _upsert(batch)
+    else:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            # list() propaga la primera excepción de cualquier lote
+            list(executor.map(_upsert, batches))
+    return len(structs)
+
+def search_embeddings(query_emb, top_k=3, filters=None, offset=0):
     return qdrant.search(
         collection_name=collection_name,
         query_vector=query_emb,
-        limit=top_k
-    )
\ No newline at end of file
+        query_filter=build_filter(filters),
+        limit=top_k,
+        offset=offset,
+    )
+
+def search_embedding_groups(query_emb, top_k=3, filters=None, offset=0):
+    """
+    Búsqueda agrupada por documento: devuelve hasta `top_k` documentos distintos
+    con su mejor chunk en una sola consulta. search_groups no admite offset, así
+    que se piden offset + top_k grupos y se descartan los primeros.
+    """
+    result = qdrant.search_groups(
+        collection_name=collection_name,
+        query_vector=query_emb,
+        group_by="document_id",
+        query_filter=build_filter(filters),
+        limit=offset + top_k,
+        group_size=1,
+    )
+    return result.groups[offset:]
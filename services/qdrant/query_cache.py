@@ -0,0 +1,104 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", 24 * 3600))
+# Si se define, los embeddings también se comparten entre workers vía SQLite
+QUERY_CACHE_SQLITE_PATH = os.getenv("QUERY_CACHE_SQLITE_PATH", "")
+
+_cache = OrderedDict()  # key -> (expires_at, embedding)
+_lock = threading.Lock()
+_stats = {"hits": 0, "shared_hits": 0, "misses": 0}
+_sqlite = None
+
+
+def normalize_query(query):
+    """Clave de caché: minúsculas, sin tildes y con espacios colapsados.
+    El tokenizer de MiniLM (uncased) ya ignora mayúsculas y tildes, así que
+    el embedding de la clave es el mismo que el de la consulta original."""
+    text = unicodedata.normalize("NFD", query.lower())
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _shared_store():
+    global _sqlite
+    if not QUERY_CACHE_SQLITE_PATH:
+        return None
+    if _sqlite is None:
+        conn = sqlite3.connect(QUERY_CACHE_SQLITE_PATH, check_same_thread=False, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.commit()
+        _sqlite = conn
+    return _sqlite
+
+
+def _shared_get(key, now):
+    conn = _shared_store()
+    if conn is None:
+        return None
+    row = conn.execute(
+        "SELECT vector, created_at FROM query_embeddings WHERE key = ?", (key,)
+    ).fetchone()
+    if not row or row[1] + QUERY_CACHE_TTL_SECONDS < time.time():
+        return None
+    return array("f", row[0]).tolist()
+
+
+def _shared_put(key, embedding):
+    conn = _shared_store()
+    if conn is None:
+        return
+    conn.execute(
+        "INSERT OR REPLACE INTO query_embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+        (key, array("f", embedding).tobytes(), time.time()),
+    )
+    conn.commit()
+
+
+def get_query_embedding(query, compute):
+    """Embedding de la consulta desde caché; `compute(texto)` solo se llama en un miss."""
+    key = normalize_query(query)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[1]
+        shared = _shared_get(key, now)
+        if shared is not None:
+            _stats["shared_hits"] += 1
+        else:
+            _stats["misses"] += 1
+
+    embedding = shared if shared is not None else compute(key)
+
+    with _lock:
+        _cache[key] = (now + QUERY_CACHE_TTL_SECONDS, embedding)
+        _cache.move_to_end(key)
+        while len(_cache) > QUERY_CACHE_SIZE:
+            _cache.popitem(last=False)
+        if shared is None:
+            _shared_put(key, embedding)
+    return embedding
+
+
+def cache_stats():
+    with _lock:
+        total = _stats["hits"] + _stats["shared_hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "size": len(_cache),
+            "hit_rate": round((total - _stats["misses"]) / total, 4) if total else 0.0,
+        }
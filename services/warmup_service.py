@@ -0,0 +1,74 @@
+"""
+Precarga de modelos en paralelo al iniciar la app y estado para `/ready`.
+
+Con los pools de procesos activos, spaCy, el índice de nombres y MiniLM solo se
+cargan dentro de los workers de cada pool; el proceso de la API no los necesita.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.executor_service import PROCESS_POOLS_ENABLED, POOL_SIZES, start_pool
+
+_estado = {"ready": False, "components": {}}
+_lock = threading.Lock()
+
+
+def _tareas():
+    from services.document.gemini_client import get_genai
+
+    tareas = {"gemini": get_genai}
+    if PROCESS_POOLS_ENABLED:
+        for name in POOL_SIZES:
+            tareas[f"{name}_pool"] = lambda name=name: start_pool(name)
+    else:
+        from services.pdf.name_index import obtener_indice_nombres
+        from services.pdf.spacy_service import get_nlp
+        from services.qdrant.embeddings_service import load_models
+
+        tareas.update({
+            "name_index": obtener_indice_nombres,
+            "spacy": get_nlp,
+            "embeddings": load_models,
+        })
+    return tareas
+
+
+def _ejecutar(nombre, tarea):
+    inicio = time.time()
+    try:
+        tarea()
+        resultado = {"status": "ready"}
+    except Exception as e:
+        resultado = {"status": "error", "error": str(e)}
+    resultado["seconds"] = round(time.time() - inicio, 3)
+    with _lock:
+        _estado["components"][nombre] = resultado
+
+
+def warm_up():
+    """Carga todos los componentes en hilos paralelos (bloqueante)."""
+    tareas = _tareas()
+    with _lock:
+        _estado["components"] = {nombre: {"status": "loading"} for nombre in tareas}
+    with ThreadPoolExecutor(max_workers=len(tareas)) as executor:
+        for nombre, tarea in tareas.items():
+            executor.submit(_ejecutar, nombre, tarea)
+    with _lock:
+        _estado["ready"] = all(
+            c["status"] == "ready" for c in _estado["components"].values()
+        )
+
+
+def start_warm_up():
+    """Lanza warm_up en segundo plano: el servidor acepta peticiones mientras tanto."""
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def readiness():
+    with _lock:
+        return {
+            "ready": _estado["ready"],
+            "components": {k: dict(v) for k, v in _estado["components"].items()},
+        }
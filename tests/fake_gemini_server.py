@@ -0,0 +1,115 @@
+"""
+Servidor falso de la API REST de Gemini para pruebas locales.
+
+Responde `generateContent` con una lista de respuestas programadas
+(status, demora, texto); cuando se acaban, repite la última.
+
+Uso manual:
+    python -m tests.fake_gemini_server 8089
+    GEMINI_API_ENDPOINT=http://localhost:8089 uv run uvicorn main:app
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ESTADOS = {
+    400: "INVALID_ARGUMENT",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+
+
+class FakeGemini:
+    def __init__(self, port=0):
+        self.respuestas = [(200, 0, "ok")]
+        self.llamadas = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def programar(self, *respuestas):
+        """Cada respuesta es (status, demora_en_segundos, texto)."""
+        with self._lock:
+            self.respuestas = list(respuestas)
+            self.llamadas = 0
+
+    def _siguiente(self):
+        with self._lock:
+            self.llamadas += 1
+            if len(self.respuestas) > 1:
+                return self.respuestas.pop(0)
+            return self.respuestas[0]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if ":generateContent" not in self.path:
+                    self._responder(404, {"error": {"code": 404, "message": "No encontrado"}})
+                    return
+                status, demora, texto = fake._siguiente()
+                if demora:
+                    time.sleep(demora)
+                if status == 200:
+                    cuerpo = {
+                        "candidates": [
+                            {
+                                "content": {"parts": [{"text": texto}], "role": "model"},
+                                "finishReason": "STOP",
+                                "index": 0,
+                            }
+                        ]
+                    }
+                else:
+                    cuerpo = {
+                        "error": {
+                            "code": status,
+                            "message": texto,
+                            "status": _ESTADOS.get(status, "UNKNOWN"),
+                        }
+                    }
+                self._responder(status, cuerpo)
+
+            def _responder(self, status, cuerpo):
+                datos = json.dumps(cuerpo).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(datos)))
+                    self.end_headers()
+                    self.wfile.write(datos)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente cortó por timeout
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def detener(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    servidor = FakeGemini(int(sys.argv[1]) if len(sys.argv) > 1 else 8089)
+    print(f"Gemini falso en {servidor.url}")
+    servidor._server.serve_forever()
@@ -0,0 +1,33 @@
+"""
+Paridad del MiniLM int8 exportado (ONNX) contra PyTorch. Se salta si faltan las
+dependencias del extra `onnx` o si el modelo todavía no se exportó.
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from services.qdrant.onnx_export import (  # noqa: E402
+    MODEL_NAME,
+    ONNX_MODEL_PATH,
+    PARITY_MIN_COSINE,
+    verificar_paridad,
+)
+
+
+@pytest.mark.skipif(
+    not os.path.exists(ONNX_MODEL_PATH),
+    reason=f"No existe {ONNX_MODEL_PATH}: correr `python -m services.qdrant.onnx_export`",
+)
+def test_paridad_onnx_int8():
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME)
+    model.eval()
+
+    assert verificar_paridad(tokenizer, model, ONNX_MODEL_PATH) >= PARITY_MIN_COSINE